@@ -5,36 +5,42 @@ Based on them, you can build your own parsers of other banks.
 """
 
 import abc
-import json
+import datetime
 import logging
 import socket
+import threading
 import time
 import uuid
 from collections import namedtuple
 from typing import (
+    Callable,
     ClassVar,
     Dict,
     Iterator,
     List,
     Optional,
+    Sequence,
+    TYPE_CHECKING,
     Type,
     Union,
 )
 
-import requests
-from requests.exceptions import ConnectionError
-
-from selenium import webdriver
 from selenium.common.exceptions import TimeoutException as SeleniumTimeoutException
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.remote.webelement import WebElement
-from selenium.webdriver.support import expected_conditions
-from selenium.webdriver.support.ui import WebDriverWait
 
+from py_parser_sber.capture import install_recorder
+from py_parser_sber.state import StateStore
+from py_parser_sber.throttle import (
+    RateLimiter,
+    throttled,
+)
 from py_parser_sber.utils import (
     Retry,
     uri_validator,
 )
+if TYPE_CHECKING:
+    # selenium.webdriver is heavy. It's imported, only when web driver is needed
+    from selenium.webdriver.remote.webdriver import WebDriver
+    from selenium.webdriver.remote.webelement import WebElement
 
 
 logger = logging.getLogger(__name__)
@@ -42,6 +48,20 @@ logger = logging.getLogger(__name__)
 TIMEOUT = 30
 Transaction = namedtuple('Transaction', ['id', 'transaction'])
 
+# legacy - uuid of position of transaction in his day, needs all transactions of the day before first id
+# content - uuid of content of transaction and number of same transactions before it in the day
+# migrate - content ids with legacy ids (field legacy_id) for re-keying of already received transactions
+TRANSACTION_ID_SCHEMES = ('legacy', 'migrate', 'content')
+LEGACY_ID_FIELDS = ('order_id', 'account_name', 'tr_time', 'cost', 'currency', 'description')
+
+
+class AccountNotFoundError(LookupError):
+    """Requested account is not found on accounts pages of bank client."""
+
+
+class SessionExpiredError(RuntimeError):
+    """Session of bank client is expired on server side: login page is opened instead of requested one."""
+
 
 class AbstractAccount(abc.ABC):  # noqa H601
     """AbstractAccount have parser class abstractmethod and save his values, as result of this parser."""
@@ -56,7 +76,7 @@ class AbstractAccount(abc.ABC):  # noqa H601
 
     @classmethod
     @abc.abstractmethod
-    def account_parser(cls, raw_account: WebElement) -> Type['AbstractAccount']:
+    def account_parser(cls, raw_account: 'WebElement') -> Type['AbstractAccount']:
         """Get raw parsed data (strings) and create, based on it, own class."""
 
     @property
@@ -80,13 +100,15 @@ class AbstractAccount(abc.ABC):  # noqa H601
 class AbstractTransaction(abc.ABC):  # noqa H601
     """AbstractTransaction have parser class abstractmethod and save his values, as result of this parser."""
 
-    def __init__(self, order_id: str, account_name: str, tr_time: str, cost: str, currency: str, description: str):
+    def __init__(self, order_id: Optional[int], account_name: str, tr_time: str, cost: str, currency: str,
+                 description: str, occurrence: Optional[int] = None):
         self.order_id = order_id
         self.account_name = account_name
         self.tr_time = tr_time
         self.cost = cost
         self.currency = currency
         self.description = description
+        self.occurrence = occurrence
 
     def __repr__(self):  # noqa D105
         return '{class_name}({params})'.format(
@@ -97,7 +119,7 @@ class AbstractTransaction(abc.ABC):  # noqa H601
     @abc.abstractmethod
     def transaction_parser(
             cls,
-            raw_transaction: WebElement,
+            raw_transaction: 'WebElement',
             account: Type[AbstractAccount]
     ) -> Iterator[Optional[Type['AbstractTransaction']]]:
         """Get raw parsed data (strings) and create, based on it, own class."""
@@ -113,12 +135,28 @@ class AbstractTransaction(abc.ABC):  # noqa H601
 
     @property
     def transaction_id(self) -> str:
-        """Create unique id of transaction, if it not exist."""
-        return uuid.uuid5(uuid.NAMESPACE_X500, repr(self)).hex
+        """Create unique id of transaction: content id, if occurrence is known, else legacy one."""
+        if self.occurrence is not None:
+            return self.content_id
+        return self.legacy_id
+
+    @property
+    def legacy_id(self) -> Optional[str]:
+        """Create id from position of transaction in his day (order_id), as repr of transaction did before."""
+        if self.order_id is None:
+            return None
+        params = ', '.join(f"{k}='{getattr(self, k)}'" for k in LEGACY_ID_FIELDS)
+        return uuid.uuid5(uuid.NAMESPACE_X500, f'{self.__class__.__name__}({params})').hex
+
+    @property
+    def content_id(self) -> str:
+        """Create id from content of transaction and number of same transactions before it in the day."""
+        content = (self.account_name, self.tr_time, self.cost, self.currency, self.description, self.occurrence)
+        return uuid.uuid5(uuid.NAMESPACE_X500, f'{self.__class__.__name__}:{content!r}').hex
 
     def to_json(self):
         """Return data for api, BudgetTracker compatible."""
-        return {
+        data = {
             'id': self.transaction_id,
             'account': self.account_name,
             'when': self.tr_time,
@@ -126,6 +164,69 @@ class AbstractTransaction(abc.ABC):  # noqa H601
             'currency': self.currency,
             'what': self.description
         }
+        if self.occurrence is not None and self.order_id is not None:
+            # migration from legacy ids: receiver can re-key received transaction
+            data['legacy_id'] = self.legacy_id
+        return data
+
+
+class AbstractSink(abc.ABC):  # noqa H601
+    """
+    Append-only receiver of parsed data in BudgetTracker compatible format (to_json of accounts and transactions).
+
+    Rows are buffered and written by batches of batch_size. If batch_size is not set, they are written on flush only.
+    Batch is dropped from buffer, even if it is not written: after error parser does not save balances,
+    so the same data is parsed and written again by next iteration.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self.batch_size = batch_size
+        self._accounts: List[Dict] = []
+        self._transactions: List[Dict] = []
+        self._lock = threading.RLock()
+
+    @abc.abstractmethod
+    def _write_accounts_batch(self, accounts: List[Dict]) -> None:
+        """Write batch of accounts."""
+
+    @abc.abstractmethod
+    def _write_transactions_batch(self, transactions: List[Dict]) -> None:
+        """Write batch of transactions."""
+
+    def write_accounts(self, accounts: Sequence[Dict]) -> None:
+        """Add accounts to buffer and write full batches."""
+        with self._lock:
+            self._accounts.extend(accounts)
+            self._write_full_batches(self._accounts, self._write_accounts_batch)
+
+    def write_transactions(self, transactions: Sequence[Dict]) -> None:
+        """Add transactions to buffer and write full batches."""
+        with self._lock:
+            self._transactions.extend(transactions)
+            self._write_full_batches(self._transactions, self._write_transactions_batch)
+
+    def _write_full_batches(self, buffer: List[Dict], writer: Callable[[List[Dict]], None]) -> None:
+        while self.batch_size and len(buffer) >= self.batch_size:
+            batch = buffer[:self.batch_size]
+            del buffer[:self.batch_size]
+            writer(batch)
+
+    def flush(self) -> None:
+        """Write everything from buffers."""
+        with self._lock:
+            for buffer, writer in ((self._accounts, self._write_accounts_batch),
+                                   (self._transactions, self._write_transactions_batch)):
+                if buffer:
+                    batch = buffer[:]
+                    buffer.clear()
+                    writer(batch)
+
+    def close(self) -> None:
+        """Flush buffers and free resources."""
+        self.flush()
+
+    def __repr__(self):  # noqa D105
+        return f'{self.__class__.__name__}()'
 
 
 class AbstractClientParser(abc.ABC):  # noqa H601
@@ -138,23 +239,59 @@ class AbstractClientParser(abc.ABC):  # noqa H601
     main_page: str
 
     def __init__(self, login: str, password: str, transactions_interval: int,
-                 server_url: str, server_scheme: str, server_port: str,
-                 send_account_url: str, send_payment_url: str) -> None:
-
-        self.main_page = uri_validator(type(self).main_page)
+                 server_url: Optional[str] = None, server_scheme: str = 'http', server_port: str = '80',
+                 send_account_url: str = '', send_payment_url: str = '',
+                 state_path: Optional[str] = None, pending_window: int = 0, full_check_interval: int = 0,
+                 sinks: Optional[Sequence[AbstractSink]] = None,
+                 capture: bool = False, main_page: Optional[str] = None,
+                 driver: Optional['WebDriver'] = None, state: Optional[StateStore] = None,
+                 transaction_id_scheme: str = 'legacy', rate_limiter: Optional[RateLimiter] = None,
+                 clock: Optional[Callable[[], datetime.datetime]] = None) -> None:
+
+        if transaction_id_scheme not in TRANSACTION_ID_SCHEMES:
+            raise ValueError(f'Unknown transaction id scheme {transaction_id_scheme!r}. '
+                             f'Available: {", ".join(TRANSACTION_ID_SCHEMES)}')
+        self.transaction_id_scheme = transaction_id_scheme
+        # current time of search interval and relative dates of transactions. Replay freezes it at time of record
+        self.clock = clock or datetime.datetime.now
+        # can be shared between parsers, to limit all requests to bank site together
+        self.rate_limiter = rate_limiter
+        self.main_page = uri_validator(main_page or type(self).main_page)
+        self.capture = capture
         self.login = login
         self.password = password
         self.transactions_interval = transactions_interval
-
-        self.driver = self._prepare_webdriver()
         self._container: Dict[AbstractAccount, List[Optional[AbstractTransaction]]] = {}
 
-        self.server_url = uri_validator(f'{server_scheme}://{socket.gethostbyname(server_url)}:{server_port}')
-        self.send_account_url = f'{self.server_url}{send_account_url}'
-        self.send_payment_url = f'{self.server_url}{send_payment_url}'
+        # receivers of parsed data. By default - BudgetTracker-like web server.
+        # Passed sinks can be shared between parsers, so they are closed by owner
+        self.sinks: List[AbstractSink] = list(sinks or [])
+        self._own_sinks: List[AbstractSink] = []
+        if server_url is not None:
+            from py_parser_sber.sinks import HttpSink
+
+            server_url = uri_validator(f'{server_scheme}://{socket.gethostbyname(server_url)}:{server_port}')
+            self._own_sinks.append(HttpSink(f'{server_url}{send_account_url}', f'{server_url}{send_payment_url}'))
+            self.sinks.extend(self._own_sinks)
+        if not self.sinks:
+            raise ValueError('Set server_url or sinks for sending parsed data')
+
+        # passed web driver can be shared between parsers, so it is not quit on close
+        self._own_driver = driver is None
+        self.driver = self._prepare_webdriver() if driver is None else driver
+
+        # balance-change gating: skip transactions search for accounts, which balance did not move
+        self.state = state if state is not None else StateStore(state_path)
+        self.pending_window = pending_window
+        self.full_check_interval = full_check_interval
+        self.force_transactions_check = False
+        self._checked_accounts: List[AbstractAccount] = []
 
     @staticmethod
     def _prepare_webdriver():
+        from selenium import webdriver
+        from selenium.webdriver.firefox.options import Options
+
         options = Options()
         options.headless = True
 
@@ -162,17 +299,22 @@ class AbstractClientParser(abc.ABC):  # noqa H601
         driver.set_page_load_timeout(TIMEOUT)
         return driver
 
-    def wait_click_redirect(self, click_item: WebElement) -> None:
+    def wait_click_redirect(self, click_item: 'WebElement') -> None:
         """Wait clicked element redirect."""
+        from selenium.webdriver.support import expected_conditions
+        from selenium.webdriver.support.ui import WebDriverWait
+
         current_url = self.driver.current_url
 
         def main_logic():
-            click_item.click()
-            start_time = time.monotonic()
-            WebDriverWait(self.driver, TIMEOUT).until(expected_conditions.url_changes(current_url))
+            with throttled(self.rate_limiter):
+                click_item.click()
+                start_time = time.monotonic()
+                WebDriverWait(self.driver, TIMEOUT).until(expected_conditions.url_changes(current_url))
             end_time = time.monotonic() - start_time
             logger.info(f'Success redirect from {current_url} to {self.driver.current_url} '
                         f'by {end_time:.2f} seconds')
+            self._on_page_loaded()
 
         retry = Retry(
             function=main_logic,
@@ -191,9 +333,11 @@ class AbstractClientParser(abc.ABC):  # noqa H601
         """Get method, wrapped by Retry mechanism."""
         def main_logic():
             start_time = time.monotonic()
-            self.driver.get(url)
+            with throttled(self.rate_limiter):
+                self.driver.get(url)
             end_time = time.monotonic() - start_time
             logger.info(f"Success loading page: {url} by {end_time:.2f} seconds")
+            self._on_page_loaded()
 
         retry = Retry(
             function=main_logic,
@@ -208,6 +352,23 @@ class AbstractClientParser(abc.ABC):  # noqa H601
             self.close()
             raise SeleniumTimeoutException from exc
 
+    def _on_page_loaded(self) -> None:
+        if self.capture:
+            install_recorder(self.driver)
+
+    @property
+    @abc.abstractmethod
+    def is_authenticated(self) -> bool:
+        """Check if current browser session is logged in bank client WebGUI."""
+
+    def is_alive(self) -> bool:
+        """Check if web driver is still responding."""
+        try:
+            return self.driver.current_url is not None
+        except Exception:
+            logger.debug('Web driver is not responding', exc_info=True)
+            return False
+
     @abc.abstractmethod
     def auth(self) -> None:
         """Authenticate in bank client WebGUI."""
@@ -220,36 +381,151 @@ class AbstractClientParser(abc.ABC):  # noqa H601
     def transactions_pages_parser(self) -> None:
         """Parse page with transactions (payments, receipts and etc.)."""
 
-    @staticmethod
-    def _send_request(url: str, data: Union[Dict, List]) -> None:
-        headers = {'content-type': 'application/json'}
-        retry = Retry(
-            function=requests.post,
-            error=ConnectionError,
-            err_msg=f'request to url {url} not sending',
-            max_attempts=3
-        )
-        r = retry(url=url, data=json.dumps(data), headers=headers)
-        if r.status_code != 200:
-            logger.warning(f'request to url {url} with data {data} not sending')
-            logger.error(r.text)
+    @property
+    def _balances(self) -> Dict[str, Dict[str, Union[str, float]]]:
+        # state can be shared between parsers of different banks and logins
+        return self.state.section(f'balances:{type(self).__name__}:{self.login}')
+
+    def _account_changed(self, account: AbstractAccount) -> bool:
+        if self.force_transactions_check:
+            return True
+        last_seen = self._balances.get(account.account_id)
+        return last_seen is None or last_seen['funds'] != account.funds
+
+    def _need_transactions_check(self, account: AbstractAccount, now: float) -> bool:
+        if self._account_changed(account):
+            return True
+
+        last_seen = self._balances[account.account_id]
+        if now - last_seen.get('changed_at', 0) < self.pending_window:
+            # transactions can appear in history later, than balance moved
+            return True
+        return now - last_seen.get('checked_at', 0) >= self.full_check_interval
+
+    def accounts_for_transactions_check(self) -> List[AbstractAccount]:
+        """Get parsed accounts, which balance moved, is in pending window or need periodic full check."""
+        now = time.time()
+        self._checked_accounts = [acc for acc in self._container if self._need_transactions_check(acc, now)]
+        for account in self._container.keys() - set(self._checked_accounts):
+            logger.info(f'Balance of account {account.name} did not change. Skip transactions search')
+        return self._checked_accounts
+
+    def transactions_from_date(self, account: AbstractAccount) -> datetime.datetime:
+        """Get start of transactions search: last check of account, if it was earlier, than transactions_interval."""
+        from_date = self.clock() - datetime.timedelta(seconds=self.transactions_interval)
+        last_seen = self._balances.get(account.account_id)
+        if last_seen is not None and 'checked_at' in last_seen and not self.force_transactions_check:
+            from_date = min(from_date, datetime.datetime.fromtimestamp(last_seen['checked_at']))
+        return from_date
+
+    def save_balances(self) -> None:
+        """Remember last seen balances and time of transactions check. Call after successful sending."""
+        now = time.time()
+        with self.state.lock:
+            for account in self._container:
+                last_seen = self._balances.get(account.account_id)
+                if last_seen is None or last_seen['funds'] != account.funds:
+                    last_seen = self._balances[account.account_id] = {'funds': account.funds, 'changed_at': now}
+                if account in self._checked_accounts:
+                    last_seen['checked_at'] = now
+            self.state.save()
+
+    def _write_to_sinks(self, write_method: str, data: List[Dict]) -> None:
+        """Write data to every sink. Error of one sink does not stop others, but raised after all."""
+        error: Optional[Exception] = None
+        for sink in self.sinks:
+            try:
+                getattr(sink, write_method)(data)
+                sink.flush()
+            except Exception as err:
+                logger.exception(f'{sink!r} failed to write data: {err}')
+                error = error or err
+        if error is not None:
+            raise error
 
     def send_account_data(self) -> None:
-        """Send bank account data (AbstractAccount) to send_account_url."""
-        data = [acc.to_json() for acc in self._container.keys()]
-        self._send_request(url=self.send_account_url, data=data)
+        """Send bank account data (AbstractAccount), which balance changed, to every sink."""
+        data = [acc.to_json() for acc in self._container.keys() if self._account_changed(acc)]
+        if data:
+            self._write_to_sinks('write_accounts', data)
+        else:
+            logger.info('No changed accounts for last time')
 
     def send_payment_data(self) -> None:
-        """Send bank payment data (AbstractTransaction) to send_account_url."""
+        """Send bank payment data (AbstractTransaction) to every sink."""
         data = [tr.to_json() for acc_tr in self._container.values() for tr in acc_tr if tr is not None]
         if data:
-            self._send_request(url=self.send_payment_url, data=data)
+            self._write_to_sinks('write_transactions', data)
         else:
             logger.info('No transactions data for last time')
 
+    def _parse(self, account_id: Optional[str] = None) -> None:
+        self.accounts_page_parser()
+        if account_id is not None:
+            self._container = {acc: trs for acc, trs in self._container.items() if acc.account_id == account_id}
+            if not self._container:
+                raise AccountNotFoundError(f'Account {account_id} not found')
+        self.transactions_pages_parser()
+
+    def run_cycle(self, account_id: Optional[str] = None, force: bool = False) -> Dict[str, Union[int, float]]:
+        """
+        Run one iteration (auth if needed, parse and send) on the live browser session.
+
+        If session is expired on server side, it is authenticated again and parsing is started from the beginning.
+        If account_id is set, only this account and his transactions are parsed and sent.
+        If force is set, transactions of every account are searched, even if balance did not move.
+        Return stats of iteration.
+        """
+        start_time = time.monotonic()
+        if not self.is_authenticated:
+            self.auth()
+
+        self.force_transactions_check = force
+        try:
+            try:
+                self._parse(account_id)
+            except SessionExpiredError:
+                # warm browser session can be expired by bank after idle
+                logger.info('Session is expired. Authenticate again')
+                self._container.clear()
+                self._checked_accounts.clear()
+                self.auth()
+                self._parse(account_id)
+
+            stats: Dict[str, Union[int, float]] = {
+                'accounts': len(self._container),
+                'checked_accounts': len(self._checked_accounts),
+                'transactions': sum(1 for acc_tr in self._container.values() for tr in acc_tr if tr is not None),
+            }
+            self.send_account_data()
+            self.send_payment_data()
+            self.save_balances()
+        finally:
+            self._container.clear()
+            self._checked_accounts.clear()
+            self.force_transactions_check = False
+
+        stats['duration'] = round(time.monotonic() - start_time, 2)
+        logger.info(f'Success iteration by {stats["duration"]:.2f} seconds')
+        return stats
+
+    def logout(self) -> None:
+        """Log out from bank client WebGUI. By default, only cookies of current domain are deleted."""
+        self.driver.delete_all_cookies()
+
     def close(self) -> None:
-        """Graceful shutdown."""
-        logger.info('Force closing the web driver ...')
-        self.driver.quit()
-        self._container.clear()
+        """Graceful shutdown. Shared web driver is logged out, if it is still alive."""
+        try:
+            if self._own_driver:
+                logger.info('Force closing the web driver ...')
+                self.driver.quit()
+            elif self.is_alive():
+                logger.info('Logout from shared web driver ...')
+                self.logout()
+            else:
+                logger.info('Shared web driver is already closed')
+        finally:
+            self._container.clear()
+            for sink in self._own_sinks:
+                sink.close()
         logger.debug('Done')
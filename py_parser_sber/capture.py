@@ -0,0 +1,283 @@
+"""
+Network capture mode: parse responses, which bank page loads, instead of element by element DOM reading.
+
+Page documents are got by one page_source call, XHR/fetch responses are recorded in browser by injected script.
+Every parser returns None, if response format is not recognized. Then caller falls back to DOM parsers.
+"""
+
+import json
+import logging
+import re
+from html.parser import HTMLParser
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# record XHR and fetch responses with html or json body to window.__pyParserSberResponses
+RECORDER_JS = """
+if (!window.__pyParserSberResponses) {
+    window.__pyParserSberResponses = [];
+    var maxResponses = 50;
+    var record = function (url, status, contentType, body) {
+        if (!/html|json/.test(contentType || '')) { return; }
+        window.__pyParserSberResponses.push({url: url, status: status, contentType: contentType, body: body});
+        if (window.__pyParserSberResponses.length > maxResponses) { window.__pyParserSberResponses.shift(); }
+    };
+
+    var open = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        this.__pyParserSberUrl = url;
+        return open.apply(this, arguments);
+    };
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        var xhr = this;
+        xhr.addEventListener('load', function () {
+            if (xhr.responseType === '' || xhr.responseType === 'text') {
+                record(xhr.__pyParserSberUrl, xhr.status, xhr.getResponseHeader('content-type'), xhr.responseText);
+            }
+        });
+        return send.apply(this, arguments);
+    };
+
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            return fetch.apply(this, arguments).then(function (response) {
+                response.clone().text().then(function (body) {
+                    record(response.url, response.status, response.headers.get('content-type'), body);
+                });
+                return response;
+            });
+        };
+    }
+}
+"""
+
+POP_RESPONSES_JS = """
+var responses = window.__pyParserSberResponses || [];
+window.__pyParserSberResponses = [];
+return responses;
+"""
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'wbr'}
+BLOCK_TAGS = {'address', 'br', 'dd', 'div', 'dl', 'dt', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'ol', 'p',
+              'table', 'tbody', 'thead', 'tr', 'ul'}
+SKIP_TEXT_TAGS = {'script', 'style', 'noscript', 'template'}
+
+
+# tag of element (None, if element has no text, like comment) and its contents: child elements and strings
+ElementContents = Tuple[Optional[str], Iterable[Any]]
+
+
+def element_text(element: Any, contents: Callable[[Any], ElementContents]) -> str:
+    """
+    Get text of element of any html tree like WebElement.text: whitespaces collapsed, block elements on new lines.
+
+    Tree is read by contents function, which gives tag of element and its contents.
+    """
+    def text_parts(node: Any) -> Iterator[str]:
+        tag, children = contents(node)
+        if tag is None or tag in SKIP_TEXT_TAGS:
+            return
+        is_block = tag in BLOCK_TAGS
+        if is_block:
+            yield '\n'
+        for child in children:
+            if isinstance(child, str):
+                yield child
+            else:
+                yield from text_parts(child)
+        if is_block:
+            yield '\n'
+
+    lines = (re.sub(r'\s+', ' ', line).strip() for line in ''.join(text_parts(element)).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+class HtmlNode:
+    """Light element of html tree, enough for searching by tag, id and class and reading text like WebDriver."""
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional['HtmlNode'] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children: List = []  # HtmlNode or str
+
+    def get(self, attr: str, default: Optional[str] = None) -> Optional[str]:
+        """Get attribute of element."""
+        return self.attrs.get(attr, default)
+
+    def has_class_part(self, part: str) -> bool:
+        """Emulate xpath contains(@class, part)."""
+        return part in (self.attrs.get('class') or '')
+
+    def walk(self) -> Iterator['HtmlNode']:
+        """Iterate over element and all his descendants."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed([child for child in node.children if isinstance(child, HtmlNode)]))
+
+    def find_all(self, tag: Optional[str] = None, class_part: Optional[str] = None,
+                 element_id: Optional[str] = None) -> List['HtmlNode']:
+        """Find descendants by tag, part of class and id."""
+        def match(node: HtmlNode) -> bool:
+            checks = (
+                node is not self,
+                tag is None or node.tag == tag,
+                class_part is None or node.has_class_part(class_part),
+                element_id is None or node.get('id') == element_id,
+            )
+            return all(checks)
+
+        return [node for node in self.walk() if match(node)]
+
+    def find(self, tag: Optional[str] = None, class_part: Optional[str] = None,
+             element_id: Optional[str] = None) -> Optional['HtmlNode']:
+        """Find first descendant by tag, part of class and id."""
+        found = self.find_all(tag=tag, class_part=class_part, element_id=element_id)
+        return found[0] if found else None
+
+    @property
+    def text(self) -> str:
+        """Get text like WebElement.text: whitespaces are collapsed, block elements are on new lines."""
+        return element_text(self, lambda node: (node.tag, node.children))
+
+
+class _TreeBuilder(HTMLParser):
+
+    def __init__(self):
+        super(_TreeBuilder, self).__init__(convert_charrefs=True)
+        self.root = HtmlNode('document', {})
+        self._current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = HtmlNode(tag, {k: v or '' for k, v in attrs}, parent=self._current)
+        self._current.children.append(node)
+        if tag not in VOID_TAGS:
+            self._current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self._current.children.append(HtmlNode(tag, {k: v or '' for k, v in attrs}, parent=self._current))
+
+    def handle_endtag(self, tag):
+        # close nearest opened element with this tag, ignore unmatched end tags
+        node = self._current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self._current = node.parent
+
+    def handle_data(self, data):
+        self._current.children.append(data)
+
+
+def parse_html(html: str) -> HtmlNode:
+    """Build html tree from document or fragment."""
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def parse_accounts_html(html: str) -> Optional[List[Dict[str, str]]]:
+    """
+    Get raw accounts from page with accounts list.
+
+    Return list of dicts with name, url and raw_funds, or None if page is not recognized.
+    """
+    raw_accounts = []
+    for product in parse_html(html).find_all(tag='div', class_part='productCover'):
+        title = product.find(tag='span', class_part='titleBlock')
+        image = product.find(tag='div', class_part='pruductImg')
+        link = image.find(tag='a') if image is not None else None
+        funds = product.find(tag='span', class_part='overallAmount')
+        if title is None or link is None or funds is None:
+            logger.debug('Account block is not recognized')
+            return None
+        raw_accounts.append({'name': title.get('title', ''), 'url': link.get('href', ''), 'raw_funds': funds.text})
+    return raw_accounts or None
+
+
+def parse_transactions_html(html: str) -> Optional[List[List[str]]]:
+    """
+    Get raw transactions (texts of cells of every row) from page or fragment with transactions table.
+
+    Return None if table is not recognized.
+    """
+    table = parse_html(html).find(element_id='simpleTable0')
+    if table is None:
+        return None
+    rows = [[cell.text for cell in row.children if isinstance(cell, HtmlNode) and cell.tag == 'td']
+            for row in table.find_all(tag='tr', class_part='ListLine')]
+    if any(len(row) < 5 for row in rows):
+        logger.debug('Transactions table is not recognized')
+        return None
+    return rows
+
+
+def parse_transactions_json(body: str) -> Optional[List[List[str]]]:
+    """
+    Get raw transactions from json response, which contains html of transactions table (field "html" or "content").
+
+    Return None if response is not recognized.
+    """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    for field in ('html', 'content'):
+        if isinstance(data.get(field), str):
+            return parse_transactions_html(data[field])
+    return None
+
+
+def install_recorder(driver) -> None:
+    """Inject recorder of XHR and fetch responses to current page."""
+    try:
+        driver.execute_script(RECORDER_JS)
+    except Exception:
+        logger.debug('Network recorder is not installed', exc_info=True)
+
+
+def pop_responses(driver) -> List[Dict[str, str]]:
+    """Get and clear responses, recorded on current page."""
+    try:
+        return driver.execute_script(POP_RESPONSES_JS) or []
+    except Exception:
+        logger.debug('Network recorder is not available', exc_info=True)
+        return []
+
+
+def capture_transactions(driver) -> Optional[List[List[str]]]:
+    """
+    Get raw transactions of current page of history from last recognized XHR response or from page document.
+
+    Return None if nothing is recognized.
+    """
+    parsers: Dict[str, Callable[[str], Optional[List[List[str]]]]] = {
+        'html': parse_transactions_html,
+        'json': parse_transactions_json,
+    }
+    for response in reversed(pop_responses(driver)):
+        content_type = response.get('contentType') or ''
+        parser = next((parser for kind, parser in parsers.items() if kind in content_type), None)
+        rows = parser(response.get('body') or '') if parser is not None else None
+        if rows is not None:
+            logger.debug('Transactions are captured from response %s', response.get('url'))
+            return rows
+    return parse_transactions_html(driver.page_source)
@@ -0,0 +1,252 @@
+"""
+Resident daemon mode: keep warm client parsers and expose a small local control and health API.
+
+Endpoints:
+    GET  /health - process is alive and state of every browser
+    GET  /ready  - 200, if every login has authenticated browser session and daemon is not draining
+    GET  /stats  - stats of last cycle for every login
+    POST /sync   - run sync right now on the live browser session. Optional query: login, account_id, force
+    POST /drain  - wait for current syncs, close browsers and stop the daemon
+"""
+
+import datetime
+import json
+import logging
+import signal
+import socketserver
+import threading
+import time
+from http.server import (
+    BaseHTTPRequestHandler,
+    HTTPServer,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Optional,
+    Sequence,
+)
+from urllib.parse import (
+    parse_qsl,
+    urlparse,
+)
+
+from py_parser_sber.abstract import (
+    AbstractClientParser,
+    AccountNotFoundError,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class ParserWorker:
+    """Warm client parser of one login. Every access to his browser is serialized."""
+
+    def __init__(self, login: str, parser_factory: Callable[[], AbstractClientParser]):
+        self.login = login
+        self._parser_factory = parser_factory
+        self._parser: Optional[AbstractClientParser] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.last_cycle: Dict[str, Any] = {}
+
+    def sync(self, account_id: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        """Run one cycle on the live browser session. Browser is created again after any error."""
+        with self._lock:
+            started_at = datetime.datetime.now().isoformat(timespec='seconds')
+            start_time = time.monotonic()
+            cycle: Dict[str, Any] = {'login': self.login, 'account_id': account_id, 'started_at': started_at}
+            if self._closed:
+                cycle['status'] = 'closed'
+                return cycle
+            try:
+                if self._parser is None:
+                    self._parser = self._parser_factory()
+                cycle.update(self._parser.run_cycle(account_id=account_id, force=force))
+                cycle['status'] = 'ok'
+            except AccountNotFoundError as err:
+                logger.warning(err)
+                cycle['status'] = 'not_found'
+                cycle['error'] = str(err)
+            except Exception as err:
+                logger.exception(err, exc_info=True)
+                self._drop_parser()
+                cycle['status'] = 'error'
+                cycle['error'] = repr(err)
+            cycle.setdefault('duration', round(time.monotonic() - start_time, 2))
+            self.last_cycle = cycle
+            return cycle.copy()
+
+    @property
+    def is_ready(self) -> bool:
+        """Browser is created and logged in."""
+        parser = self._parser
+        return parser is not None and parser.is_authenticated
+
+    def health(self) -> Dict[str, Any]:
+        """Get state of browser without waiting for running sync."""
+        if not self._lock.acquire(blocking=False):
+            return {'browser': 'busy'}
+        try:
+            if self._parser is None:
+                return {'browser': 'not_started'}
+            return {'browser': 'alive' if self._parser.is_alive() else 'dead'}
+        finally:
+            self._lock.release()
+
+    def close(self) -> None:
+        """Wait for running sync and close browser."""
+        with self._lock:
+            self._closed = True
+            self._drop_parser()
+
+    def _drop_parser(self) -> None:
+        if self._parser is not None:
+            try:
+                self._parser.close()
+            except Exception:
+                logger.debug('Web driver is already closed', exc_info=True)
+            self._parser = None
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    parser_daemon: 'ParserDaemon'
+
+
+class _DaemonRequestHandler(BaseHTTPRequestHandler):
+    server: _ThreadingHTTPServer
+
+    def do_GET(self):  # noqa N802
+        daemon = self.server.parser_daemon
+        path = urlparse(self.path).path
+        if path == '/health':
+            self._send_json(200, daemon.health())
+        elif path == '/ready':
+            ready = daemon.is_ready
+            self._send_json(200 if ready else 503, {'ready': ready})
+        elif path == '/stats':
+            self._send_json(200, daemon.stats())
+        else:
+            self._send_json(404, {'error': f'Unknown path {path}'})
+
+    def do_POST(self):  # noqa N802
+        daemon = self.server.parser_daemon
+        url = urlparse(self.path)
+        query = dict(parse_qsl(url.query))
+        if url.path == '/sync':
+            account_id = query.get('account_id')
+            # sync of one account is always forced: it's called, when user knows about new transactions
+            force = account_id is not None or query.get('force', '').lower() in ('1', 'true')
+            status, data = daemon.sync(login=query.get('login'), account_id=account_id, force=force)
+            self._send_json(status, data)
+        elif url.path == '/drain':
+            self._send_json(202, {'draining': True})
+            threading.Thread(target=daemon.drain, name='drain').start()
+        else:
+            self._send_json(404, {'error': f'Unknown path {url.path}'})
+
+    def _send_json(self, status: int, data: Any) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa A002
+        logger.debug(f'{self.address_string()} {format % args}')
+
+
+class ParserDaemon:
+    """Run scheduled syncs of every login and serve local control and health API."""
+
+    def __init__(self, workers: Sequence[ParserWorker], interval: int, host: str, port: int):
+        self.workers = {worker.login: worker for worker in workers}
+        if len(self.workers) != len(workers):
+            raise ValueError('Every login must be used in one job only')
+        self.interval = interval
+        self._draining = threading.Event()
+
+        self.server = _ThreadingHTTPServer((host, port), _DaemonRequestHandler)
+        self.server.parser_daemon = self
+
+    @property
+    def is_ready(self) -> bool:
+        """Every login has warm browser session and daemon is not draining."""
+        return not self._draining.is_set() and all(worker.is_ready for worker in self.workers.values())
+
+    def health(self) -> Dict[str, Any]:
+        """Get state of daemon and every browser."""
+        return {
+            'status': 'draining' if self._draining.is_set() else 'ok',
+            'logins': {login: worker.health() for login, worker in self.workers.items()},
+        }
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get stats of last cycle for every login."""
+        return {login: worker.last_cycle for login, worker in self.workers.items()}
+
+    def sync(self, login: Optional[str] = None, account_id: Optional[str] = None, force: bool = False):
+        """Run sync of one login (or every login, if not set) right now. Return http status and cycles stats."""
+        if self._draining.is_set():
+            return 503, {'error': 'Daemon is draining'}
+
+        if login is None:
+            workers = list(self.workers.values())
+        elif login in self.workers:
+            workers = [self.workers[login]]
+        else:
+            return 404, {'error': f'Unknown login {login}'}
+
+        cycles = [worker.sync(account_id=account_id, force=force) for worker in workers]
+        statuses = {cycle['status'] for cycle in cycles}
+        if 'error' in statuses:
+            status = 500
+        elif 'closed' in statuses:
+            status = 503
+        elif 'not_found' in statuses:
+            status = 404
+        else:
+            status = 200
+        return status, cycles
+
+    def _scheduler(self) -> None:
+        while not self._draining.is_set():
+            for worker in self.workers.values():
+                if self._draining.is_set():
+                    break
+                worker.sync()
+            self._draining.wait(self.interval)
+
+    def drain(self) -> None:
+        """Stop scheduling, wait for current syncs, close browsers and stop http server."""
+        if self._draining.is_set():
+            return
+        logger.info('Draining daemon ...')
+        self._draining.set()
+        for worker in self.workers.values():
+            worker.close()
+        self.server.shutdown()
+        logger.info('Daemon drained')
+
+    def serve_forever(self) -> None:
+        """Start scheduler and serve API until drain."""
+        def on_signal(signum, frame):
+            # shutdown of http server can't be called from thread with serve_forever
+            threading.Thread(target=self.drain, name='drain').start()
+
+        signal.signal(signal.SIGTERM, on_signal)
+        signal.signal(signal.SIGINT, on_signal)
+
+        scheduler = threading.Thread(target=self._scheduler, name='scheduler', daemon=True)
+        scheduler.start()
+
+        host, port = self.server.server_address[:2]
+        logger.info(f'Daemon API is listening on http://{host}:{port}')
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
@@ -0,0 +1,94 @@
+"""
+Logging helpers: background writing of records, structured json output and sampling of per-row records.
+
+Records of parser are put to queue and formatted and written by listener thread, so scraping thread does not wait
+for handlers. Records are formatted only there, therefore arguments of records must not be changed after logging.
+"""
+
+import atexit
+import datetime
+import json
+import logging
+import queue
+import random
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+)
+from typing import (
+    List,
+    Optional,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# attributes of every LogRecord. Other attributes are set by extra argument of logging call
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format record as one-line json with extra attributes of record."""
+
+    def format(self, record: logging.LogRecord) -> str:  # noqa D102
+        data = {
+            'time': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        data.update((k, v) for k, v in vars(record).items() if k not in RECORD_ATTRS)
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Pass only part of records, marked as sampled (extra={'sample': True}), like records about every parsed row.
+
+    Other records are passed always.
+    """
+
+    def __init__(self, rate: float = 1.0, name: str = ''):
+        super(SamplingFilter, self).__init__(name)
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:  # noqa D102
+        if not getattr(record, 'sample', False) or self.rate >= 1:
+            return True
+        # sampling of log records, not security
+        return random.random() < self.rate  # nosec B311
+
+
+class LazyQueueHandler(QueueHandler):
+    """Put record to queue as is. It is formatted by handlers of listener, not in logging thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:  # noqa D102
+        return record
+
+
+def start_queue_logging(logger_names: Optional[List[str]] = None) -> QueueListener:
+    """
+    Move handlers of loggers to background listener, and put records to queue instead.
+
+    By default, only logger of parser is moved: records of other libraries are left as they are.
+    Loggers without handlers are skipped. Listener is stopped at exit, after writing of all records from queue.
+    """
+    loggers = [logging.getLogger(name) for name in (logger_names or ['py_parser_sber'])]
+    handlers: List[logging.Handler] = []
+    log_queue: queue.Queue = queue.Queue()
+    for queued_logger in loggers:
+        if not queued_logger.handlers:
+            continue
+        for handler in queued_logger.handlers[:]:
+            if handler not in handlers:
+                handlers.append(handler)
+            queued_logger.removeHandler(handler)
+        queued_logger.addHandler(LazyQueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
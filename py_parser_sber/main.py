@@ -4,13 +4,36 @@ import json
 import logging
 import logging.config
 import os
+import socket
+import tempfile
 import time
+from functools import partial
 from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+)
 
-from py_parser_sber.sberbank_parse import SberbankClientParser
+from py_parser_sber.abstract import AbstractSink
+from py_parser_sber.daemon import (
+    ParserDaemon,
+    ParserWorker,
+)
+from py_parser_sber.log import start_queue_logging
+from py_parser_sber.registry import get_parser_class
+from py_parser_sber.runtime import (
+    DEFAULT_BANK,
+    Runtime,
+)
+from py_parser_sber.sinks import sinks_from_spec
+from py_parser_sber.state import StateStore
+from py_parser_sber.throttle import RateLimiter
 from py_parser_sber.utils import (
     Retry,
     get_transaction_interval,
+    uri_validator,
 )
 
 logger = logging.getLogger(__name__)
@@ -20,28 +43,85 @@ def _setup_logging(logging_path='logging.json'):
     curr_dir = Path(__file__).resolve().parents[0]
     with curr_dir.joinpath(logging_path).open() as f:
         config = json.load(f)
+
+    if os.getenv('LOG_FORMAT', 'text') == 'json':
+        for handler in config.get('handlers', {}).values():
+            handler['formatter'] = 'json'
+    if os.getenv('LOG_SAMPLE_RATE'):
+        config['filters']['sampling']['rate'] = float(os.environ['LOG_SAMPLE_RATE'])
+
     logging.config.dictConfig(config)
+    # handlers write records in background thread
+    start_queue_logging()
+
+
+def _get_jobs() -> List[Dict[str, Any]]:
+    """Read jobs from json file JOBS_CONFIG or create one job from LOGIN and PASSWORD."""
+    jobs_config = os.getenv('JOBS_CONFIG')
+    if jobs_config:
+        with open(jobs_config) as f:
+            return json.load(f)
+
+    job = {'bank': os.getenv('BANK', DEFAULT_BANK), 'login': os.environ['LOGIN'], 'password': os.environ['PASSWORD']}
+    if os.getenv('MAIN_PAGE'):
+        job['main_page'] = os.environ['MAIN_PAGE']
+    if os.getenv('PAGINATION_WORKERS'):
+        job['pagination_workers'] = int(os.environ['PAGINATION_WORKERS'])
+    return [job]
+
+
+def _get_sinks() -> List[AbstractSink]:
+    sinks_spec = os.getenv('SINKS', 'http')
+    http_urls: Dict[str, str] = {}
+    if 'http' in (item.strip() for item in sinks_spec.split(',')):
+        need_env_vars = ['SERVER_URL', 'SEND_ACCOUNT_URL', 'SEND_PAYMENT_URL']
+        server_url, send_account_url, send_payment_url = (os.environ[k] for k in need_env_vars)
+        server_port = os.getenv('SERVER_PORT', 80)
+        server_scheme = os.getenv('SERVER_SCHEME', 'http')
+
+        server_url = uri_validator(f'{server_scheme}://{socket.gethostbyname(server_url)}:{server_port}')
+        http_urls = {
+            'send_account_url': f'{server_url}{send_account_url}',
+            'send_payment_url': f'{server_url}{send_payment_url}',
+        }
+    return sinks_from_spec(sinks_spec, batch_size=int(os.getenv('SINK_BATCH_SIZE', 0)), **http_urls)
+
+
+def _get_rate_limiter() -> Optional[RateLimiter]:
+    rate = float(os.getenv('RATE_LIMIT', 0))
+    if not rate:
+        return None
+    return RateLimiter(
+        rate=rate,
+        max_rate=float(os.getenv('RATE_LIMIT_MAX', rate * 2)),
+        max_concurrent=int(os.getenv('RATE_LIMIT_CONCURRENCY', 2)),
+        target_latency=float(os.getenv('RATE_LIMIT_TARGET_LATENCY', 10)),
+        # shared by every process of parser on host
+        path=os.getenv('RATE_LIMIT_PATH', str(Path(tempfile.gettempdir(), 'py_parser_sber_rate_limit.json'))),
+    )
+
+
+def _create_runtime() -> Runtime:
+    return Runtime(
+        jobs=_get_jobs(),
+        sinks=_get_sinks(),
+        state=StateStore(os.getenv('STATE_PATH', 'py_parser_sber_state.json')),
+        transactions_interval=get_transaction_interval(),
+        capture=os.getenv('PARSE_MODE', 'dom') == 'network',
+        pending_window=int(float(os.getenv('PENDING_WINDOW_HOURS', 72)) * 60 * 60),
+        full_check_interval=int(float(os.getenv('FULL_CHECK_DAYS', 7)) * 60 * 60 * 24),
+        transaction_id_scheme=os.getenv('TRANSACTION_ID_SCHEME', 'legacy'),
+        rate_limiter=_get_rate_limiter(),
+    )
 
 
 def _runner():
     logger.info('Start parsing...')
-    need_env_vars = ['LOGIN', 'PASSWORD', 'SERVER_URL', 'SEND_ACCOUNT_URL', 'SEND_PAYMENT_URL']
-    need_data_for_start = {k.lower(): os.environ[k] for k in need_env_vars}
-
-    need_data_for_start['transactions_interval'] = get_transaction_interval()
-    need_data_for_start['server_port'] = os.getenv('SERVER_PORT', 80)
-    need_data_for_start['server_scheme'] = os.getenv('SERVER_SCHEME', 'http')
-
-    sber = SberbankClientParser(**need_data_for_start)
+    runtime = _create_runtime()
     try:
-        sber.auth()
-        sber.accounts_page_parser()
-        sber.transactions_pages_parser()
-        sber.send_account_data()
-        sber.send_payment_data()
-        logger.info('Success iteration')
+        runtime.run_all()
     finally:
-        sber.close()
+        runtime.close()
 
 
 def py_parser_sber_run_once():
@@ -68,5 +148,74 @@ def py_parser_sber_run_infinite():
             time.sleep(get_transaction_interval())
 
 
+def py_parser_sber_run_daemon():
+    """Entry point for run parsing as daemon with local control and health API."""
+    _setup_logging()
+
+    runtime = _create_runtime()
+    # every login keeps his own warm browser session
+    workers = [ParserWorker(login=job['login'], parser_factory=partial(runtime.create_parser, job))
+               for job in runtime.jobs]
+    daemon = ParserDaemon(
+        workers=workers,
+        interval=get_transaction_interval(),
+        host=os.getenv('DAEMON_HOST', '127.0.0.1'),
+        port=int(os.getenv('DAEMON_PORT', 8765)),
+    )
+    try:
+        daemon.serve_forever()
+    finally:
+        runtime.close()
+
+
+def py_parser_sber_record():
+    """Entry point for record of one parsing cycle to bundle RECORD_PATH for offline replay."""
+    # replay tools are not needed by other entry points
+    from py_parser_sber.replay import RecordingDriver
+
+    _setup_logging()
+
+    runtime = _create_runtime()
+    job = dict(runtime.jobs[0])
+    bank = job.get('bank', DEFAULT_BANK)
+    if job.get('pagination_workers'):
+        # pages of additional browser sessions are not recorded
+        job['pagination_workers'] = 0
+    driver = get_parser_class(bank)._prepare_webdriver()
+    recording_driver = RecordingDriver(driver, os.environ['RECORD_PATH'], secrets=[job['login'], job['password']])
+    # fresh state, forced check of every account and time of start of record as current time, like in replay
+    parser = runtime.create_parser(
+        dict(job, driver=recording_driver, state=StateStore(), clock=lambda: recording_driver.started_at))
+    recording_driver.settings.update(
+        bank=bank,
+        login='***',
+        transactions_interval=parser.transactions_interval,
+        capture=parser.capture,
+        main_page=parser.main_page,
+        transaction_id_scheme=parser.transaction_id_scheme,
+    )
+    try:
+        parser.run_cycle(force=True)
+    finally:
+        parser.close()
+        recording_driver.save()
+        driver.quit()
+        runtime.close()
+
+
+def py_parser_sber_replay():
+    """Entry point for replay of recorded bundle REPLAY_PATH without browser and sending data."""
+    from py_parser_sber.replay import replay_bundle
+
+    _setup_logging()
+
+    stats, sink = replay_bundle(os.environ['REPLAY_PATH'])
+    logger.info(f'Replayed {stats["accounts"]} accounts and {stats["transactions"]} transactions '
+                f'by {stats["duration"]:.2f} seconds (recorded run: {stats["recorded_duration"]:.2f} seconds)')
+    if os.getenv('REPLAY_OUTPUT'):
+        with open(os.environ['REPLAY_OUTPUT'], 'w', encoding='utf-8') as f:
+            json.dump({'accounts': sink.accounts, 'transactions': sink.transactions}, f, ensure_ascii=False, indent=2)
+
+
 if __name__ == '__main__':
     py_parser_sber_run_once()
@@ -0,0 +1,72 @@
+"""
+Registry of bank parser plugins.
+
+Plugin is subclass of AbstractClientParser, registered in entry point group "py_parser_sber.banks" of any package:
+
+    entry_points={'py_parser_sber.banks': ['mybank = my_package.parse:MyBankClientParser']}
+
+Plugins are imported lazily, only when job of their bank is run.
+"""
+
+import importlib
+import logging
+from typing import (
+    Dict,
+    Type,
+)
+
+from py_parser_sber.abstract import AbstractClientParser
+
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = 'py_parser_sber.banks'
+
+# used, if package is not installed (run from sources) and entry points are not available
+BUILTIN_BANKS = {
+    'sberbank': 'py_parser_sber.sberbank_parse:SberbankClientParser',
+}
+
+_loaded: Dict[str, Type[AbstractClientParser]] = {}
+
+
+def _entry_points() -> Dict[str, str]:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # python < 3.8
+        import pkg_resources
+        return {ep.name: f'{ep.module_name}:{".".join(ep.attrs)}'
+                for ep in pkg_resources.iter_entry_points(ENTRY_POINT_GROUP)}
+
+    eps = entry_points()
+    group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+    return {ep.name: ep.value for ep in group}
+
+
+def available_banks() -> Dict[str, str]:
+    """Get names of bank plugins with their import paths, without importing them."""
+    banks = dict(BUILTIN_BANKS)
+    banks.update(_entry_points())
+    return banks
+
+
+def get_parser_class(bank: str) -> Type[AbstractClientParser]:
+    """Import (once) and return client parser class of bank."""
+    if bank in _loaded:
+        return _loaded[bank]
+
+    banks = available_banks()
+    if bank not in banks:
+        raise LookupError(f'Unknown bank {bank!r}. Available: {", ".join(sorted(banks))}')
+
+    module_name, _, class_name = banks[bank].partition(':')
+    parser_class = importlib.import_module(module_name)
+    for attr in class_name.split('.'):
+        parser_class = getattr(parser_class, attr)
+
+    if not (isinstance(parser_class, type) and issubclass(parser_class, AbstractClientParser)):
+        raise TypeError(f'{banks[bank]} is not subclass of AbstractClientParser')
+
+    logger.debug(f'Bank plugin {bank} is loaded from {banks[bank]}')
+    _loaded[bank] = parser_class
+    return parser_class
@@ -0,0 +1,475 @@
+"""
+Record and replay of bank site for offline regression and performance testing of parsers.
+
+RecordingDriver wraps web driver of real run. Before every action (page load, click, script), it saves page,
+which was seen after previous action, with url and time of action, to bundle:
+
+    <bundle>/manifest.json  - version of format, start time and settings of run and actions
+    <bundle>/pages/<sha256>.html  - pages, with scrubbed credentials and personal data
+
+Parser of recorded run uses time of start of record as current time, and parser of replay uses the same time,
+so search dates and relative dates of transactions are the same in every replay.
+
+ReplayDriver feeds pages of bundle back to parsers without browser, at full speed: every action of parser moves
+it to page of next recorded action. Needs lxml: pip install py_parser_sber[replay]
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+from urllib.parse import urljoin
+
+from selenium.common.exceptions import (
+    InvalidSelectorException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+
+from py_parser_sber.capture import (
+    ElementContents,
+    element_text,
+)
+from py_parser_sber.registry import get_parser_class
+from py_parser_sber.sinks import MemorySink
+from py_parser_sber.state import StateStore
+
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_VERSION = 2
+RECORDED_AT_FORMAT = '%Y-%m-%dT%H:%M:%S'
+MANIFEST = 'manifest.json'
+PAGES_DIR = 'pages'
+
+CARD_NUMBER_RE = re.compile(r'\b\d{4}([ -]?)\d{4}\1\d{4}\1(\d{4})\b')
+ACCOUNT_NUMBER_RE = re.compile(r'\b\d{16}(\d{4})\b')
+# ids of accounts and other objects in query of links, like info.do?id=552211, but not their pseudonyms
+ID_PARAM_RE = re.compile(r'[?&](?:amp;)?id=(?!id\d+\b)([\w-]{4,})')
+# surname, name and patronymic in any order, or surname with initials
+NAME_RE = r'[А-ЯЁ][а-яё]+'
+PATRONYMIC_RE = r'[А-ЯЁ][а-яё]+(?:ич|вна|ична)'
+INITIAL_RE = r'[А-ЯЁ]\.'
+FULL_NAME_RE = re.compile(
+    rf'\b(?:(?:{NAME_RE}\s+)?{NAME_RE}\s+{PATRONYMIC_RE}\b(?:\s+(?:{NAME_RE}\b|{INITIAL_RE}))?'
+    rf'|{NAME_RE}\s+{INITIAL_RE}\s?{INITIAL_RE})')
+# header block with name of client
+CLIENT_NAME_RE = re.compile(
+    r'(<(\w+)\b[^>]*\bclass=["\'][^"\']*(?:userName|clientName|personName|fio)[^"\']*["\'][^>]*>)(.*?)(</\2>)',
+    re.IGNORECASE | re.DOTALL)
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+PHONE_RE = re.compile(r'\+7[\s(-]*\d{3}[\s)-]*\d{3}[\s-]*\d{2}[\s-]*\d{2}')
+# values of password and hidden inputs: credentials and session tokens
+SECRET_INPUT_RE = re.compile(r'<input\b[^>]*\btype=["\']?(?:password|hidden)\b[^>]*>', re.IGNORECASE)
+INPUT_VALUE_RE = re.compile(r'(\bvalue=)(["\'])[^"\']*\2', re.IGNORECASE)
+
+
+def _replace_ids(text: str, ids: Dict[str, str]) -> str:
+    """Replace ids from query of links by pseudonyms everywhere in text, same id by same pseudonym."""
+    for found_id in ID_PARAM_RE.findall(text):
+        ids.setdefault(found_id, f'id{len(ids) + 1}')
+    if not ids:
+        return text
+    ids_re = re.compile(r'(?<![\w-])(' + '|'.join(map(re.escape, sorted(ids, key=len, reverse=True))) + r')(?![\w-])')
+    return ids_re.sub(lambda match: ids[match.group(1)], text)
+
+
+def scrub(text: str, secrets: Sequence[str] = (), ids: Optional[Dict[str, str]] = None) -> str:
+    """
+    Replace credentials, numbers of cards and accounts, emails, phones and names of persons in text.
+
+    Ids from query of links are replaced by pseudonyms. Pass the same ids dict to get the same pseudonyms
+    in every scrubbed text.
+    """
+    for secret in secrets:
+        if secret:
+            text = text.replace(secret, '***')
+    text = _replace_ids(text, {} if ids is None else ids)
+    text = CARD_NUMBER_RE.sub(r'**** **** **** \2', text)
+    text = ACCOUNT_NUMBER_RE.sub(r'****************\1', text)
+    text = EMAIL_RE.sub('***@***', text)
+    text = PHONE_RE.sub('+7 *** ***-**-**', text)
+    text = CLIENT_NAME_RE.sub(r'\1***\4', text)
+    text = FULL_NAME_RE.sub('***', text)
+    return SECRET_INPUT_RE.sub(lambda match: INPUT_VALUE_RE.sub(r'\1\2***\2', match.group(0)), text)
+
+
+def _scrub_data(data: Any, scrub_text: Callable[[str], str]) -> Any:
+    """Scrub strings in json-like result of script. Not serializable values (like elements) are dropped."""
+    if isinstance(data, str):
+        return scrub_text(data)
+    if isinstance(data, (list, tuple)):
+        return [_scrub_data(item, scrub_text) for item in data]
+    if isinstance(data, dict):
+        return {k: _scrub_data(v, scrub_text) for k, v in data.items()}
+    if data is None or isinstance(data, (bool, int, float)):
+        return data
+    return None
+
+
+def _script_id(script: str) -> str:
+    return hashlib.sha256(script.encode()).hexdigest()[:12]
+
+
+def _lxml_contents(element) -> ElementContents:
+    """Get tag and contents of lxml element: its text, child elements and their tails. Comments have no text."""
+    contents: List[Any] = [element.text or '']
+    for child in element:
+        contents.extend((child, child.tail or ''))
+    return (element.tag if isinstance(element.tag, str) else None), contents
+
+
+class RecordingElement:
+    """
+    Web element, which reports clicks to RecordingDriver. Other attributes are got from real element.
+
+    Element is identified by index of action, after which it was found, and by its locator.
+    """
+
+    def __init__(self, element, driver: 'RecordingDriver', locator: Tuple[str, Optional[str]]):
+        self._element = element
+        self._driver = driver
+        self.key = [len(driver.actions) - 1, *locator]
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None) -> 'RecordingElement':  # noqa D102
+        return RecordingElement(self._element.find_element(by, value), self._driver, (by, value))
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None) -> List['RecordingElement']:  # noqa D102
+        return [RecordingElement(element, self._driver, (by, value))
+                for element in self._element.find_elements(by, value)]
+
+    def click(self) -> None:  # noqa D102
+        self._driver.start_action('click')
+        self._element.click()
+
+    def __getattr__(self, item):  # noqa D105
+        # element is replaced on page: it must be stale in replay too
+        try:
+            value = getattr(self._element, item)
+        except StaleElementReferenceException:
+            self._driver.record_stale(self)
+            raise
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            try:
+                return value(*args, **kwargs)
+            except StaleElementReferenceException:
+                self._driver.record_stale(self)
+                raise
+        return call
+
+
+class RecordingDriver:
+    """Wrapper of web driver, which records pages of every action to bundle."""
+
+    def __init__(self, driver, path: str, secrets: Sequence[str] = (), settings: Optional[Dict[str, Any]] = None):
+        self._driver = driver
+        self.path = Path(path)
+        self.secrets = [secret for secret in secrets if secret]
+        self.settings = settings or {}
+        # current time for parser of recorded run and of its replays
+        self.started_at = datetime.datetime.now().replace(microsecond=0)
+        # pseudonyms of ids from links
+        self._ids: Dict[str, str] = {}
+        self.actions: List[Dict[str, Any]] = []
+        self._action_started_at = time.monotonic()
+        (self.path / PAGES_DIR).mkdir(parents=True, exist_ok=True)
+        self.start_action('start')
+
+    def _save_page(self) -> Dict[str, str]:
+        try:
+            url, html = self._driver.current_url, self._driver.page_source
+        except WebDriverException:
+            logger.debug('Page is not recorded', exc_info=True)
+            url, html = '', ''
+        html = self.scrub(html)
+        # same pages are saved once
+        page = f'{hashlib.sha256(html.encode()).hexdigest()}.html'
+        page_path = self.path / PAGES_DIR / page
+        if not page_path.exists():
+            page_path.write_text(html, encoding='utf-8')
+        return {'url': self.scrub(url), 'page': page}
+
+    def scrub(self, text: str) -> str:
+        """Scrub text with credentials of run and the same pseudonyms of ids in every page."""
+        return scrub(text, self.secrets, self._ids)
+
+    def start_action(self, action: str, target: Optional[str] = None) -> Dict[str, Any]:
+        """Save page, seen after previous action, and start new action."""
+        now = time.monotonic()
+        if self.actions:
+            self.actions[-1].update(self._save_page(), elapsed=round(now - self._action_started_at, 3))
+        self._action_started_at = now
+        self.actions.append({'action': action, 'target': target})
+        return self.actions[-1]
+
+    def get(self, url: str) -> None:  # noqa D102
+        self.start_action('get', self.scrub(url))
+        self._driver.get(url)
+
+    def execute_script(self, script: str, *args) -> Any:  # noqa D102
+        action = self.start_action('script', _script_id(script))
+        args = [arg._element if isinstance(arg, RecordingElement) else arg for arg in args]
+        result = self._driver.execute_script(script, *args)
+        action['result'] = _scrub_data(result, self.scrub)
+        return result
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None) -> RecordingElement:  # noqa D102
+        return RecordingElement(self._driver.find_element(by, value), self, (by, value))
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None) -> List[RecordingElement]:  # noqa D102
+        return [RecordingElement(element, self, (by, value)) for element in self._driver.find_elements(by, value)]
+
+    def record_stale(self, element: RecordingElement) -> None:
+        """Remember, that element became stale after current action."""
+        stale = self.actions[-1].setdefault('stale', [])
+        if element.key not in stale:
+            stale.append(element.key)
+
+    def save(self) -> None:
+        """Save page of last action and manifest of bundle."""
+        self.start_action('end')
+        manifest = {
+            'version': BUNDLE_VERSION,
+            'recorded_at': format(self.started_at, RECORDED_AT_FORMAT),
+            'settings': self.settings,
+            'actions': self.actions[:-1],
+        }
+        with (self.path / MANIFEST).open('w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        logger.info(f'{len(manifest["actions"])} actions are recorded to {self.path}')
+
+    def __getattr__(self, item):  # noqa D105
+        return getattr(self._driver, item)
+
+
+class ReplayElement:
+    """
+    Element of recorded page with part of WebElement interface, which is used by parsers.
+
+    After action, element is found on new page by its path. It is stale, if it was stale in recorded run,
+    or if there is no element with this path.
+    """
+
+    def __init__(self, element, driver: 'ReplayDriver', locator: Tuple[str, Optional[str]]):
+        self._element = element
+        self._driver = driver
+        self._action_index = driver.action_index
+        self.key = [driver.action_index, *locator]
+
+    def _current(self):
+        """Get element of current page."""
+        if self._action_index == self._driver.action_index:
+            return self._element
+        stale = self._driver.action_index < self._action_index or any(
+            self.key in action.get('stale', [])
+            for action in self._driver.actions[self.key[0] + 1:self._driver.action_index + 1])
+        document = self._driver.document()
+        found = document.xpath(self._element.getroottree().getpath(self._element)) if document is not None else []
+        if stale or not found:
+            raise StaleElementReferenceException('Element is not on current page')
+        self._element, self._action_index = found[0], self._driver.action_index
+        return self._element
+
+    @property
+    def tag_name(self) -> str:  # noqa D102
+        return self._current().tag
+
+    @property
+    def text(self) -> str:
+        """Get text like WebElement.text: whitespaces are collapsed, block elements are on new lines."""
+        return element_text(self._current(), _lxml_contents)
+
+    def get_attribute(self, name: str) -> Optional[str]:  # noqa D102
+        value = self._current().get(name)
+        if value is not None and name in ('href', 'src'):
+            value = urljoin(self._driver.current_url, value)
+        return value
+
+    def is_displayed(self) -> bool:
+        """Check inline styles and hidden attributes of element and his parents: css of page is not replayed."""
+        element = self._current()
+        if element.get('type') == 'hidden':
+            return False
+        while element is not None:
+            style = (element.get('style') or '').replace(' ', '').lower()
+            if 'display:none' in style or 'visibility:hidden' in style or element.get('hidden') is not None:
+                return False
+            element = element.getparent()
+        return True
+
+    def is_enabled(self) -> bool:  # noqa D102
+        return self._current().get('disabled') is None
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None) -> 'ReplayElement':  # noqa D102
+        return self._driver.find_element(by, value, root=self._current())
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None) -> List['ReplayElement']:  # noqa D102
+        return self._driver.find_elements(by, value, root=self._current())
+
+    def click(self) -> None:  # noqa D102
+        self._current()
+        self._driver.replay_action('click')
+
+    def send_keys(self, *value: str) -> None:  # noqa D102
+        self._current()
+
+    def clear(self) -> None:  # noqa D102
+        self._current()
+
+
+class ReplayDriver:
+    """
+    Web driver, which replays bundle of RecordingDriver.
+
+    Action (get, click, script) moves driver to next recorded action of the same type (and url or script).
+    """
+
+    # locators of WebDriver as xpath with variable $value
+    XPATH_LOCATORS = {
+        By.ID: './/*[@id=$value]',
+        By.NAME: './/*[@name=$value]',
+        By.CLASS_NAME: './/*[contains(concat(" ", normalize-space(@class), " "), concat(" ", $value, " "))]',
+        By.LINK_TEXT: './/a[normalize-space(string(.))=$value]',
+        By.PARTIAL_LINK_TEXT: './/a[contains(string(.), $value)]',
+    }
+
+    def __init__(self, path: str):
+        try:
+            import lxml.html
+        except ImportError as err:
+            raise ImportError('ReplayDriver needs lxml: pip install py_parser_sber[replay]') from err
+
+        self._lxml_html = lxml.html
+        self.path = Path(path)
+        with (self.path / MANIFEST).open(encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != BUNDLE_VERSION:
+            raise ValueError(f'Version {manifest.get("version")} of bundle {self.path} is not supported')
+        self.settings: Dict[str, Any] = manifest['settings']
+        self.recorded_at = datetime.datetime.strptime(manifest['recorded_at'], RECORDED_AT_FORMAT)
+        self.actions: List[Dict[str, Any]] = manifest['actions']
+        self.action_index = 0
+        self._documents: Dict[str, Any] = {}
+
+    @property
+    def recorded_duration(self) -> float:
+        """Get time of recorded run in seconds."""
+        return sum(action.get('elapsed', 0) for action in self.actions)
+
+    @property
+    def current_url(self) -> str:  # noqa D102
+        return self.actions[self.action_index]['url']
+
+    @property
+    def page_source(self) -> str:  # noqa D102
+        return (self.path / PAGES_DIR / self.actions[self.action_index]['page']).read_text(encoding='utf-8')
+
+    def document(self):
+        """Get parsed page of current action."""
+        page = self.actions[self.action_index]['page']
+        if page not in self._documents:
+            html = self.page_source
+            self._documents[page] = self._lxml_html.document_fromstring(html) if html.strip() else None
+        return self._documents[page]
+
+    def replay_action(self, action: str, target: Optional[str] = None) -> Dict[str, Any]:
+        """Go to next recorded action of this type and target."""
+        for index in range(self.action_index + 1, len(self.actions)):
+            recorded = self.actions[index]
+            if recorded['action'] == action and (target is None or recorded['target'] == target):
+                self.action_index = index
+                return recorded
+        raise WebDriverException(f'Action {action} {target or ""} is not recorded after action {self.action_index}')
+
+    def get(self, url: str) -> None:  # noqa D102
+        self.replay_action('get', scrub(url))
+
+    def execute_script(self, script: str, *args) -> Any:  # noqa D102
+        return self.replay_action('script', _script_id(script)).get('result')
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None, root=None) -> List[ReplayElement]:  # noqa D102
+        root = self.document() if root is None else root
+        if root is None:
+            return []
+        try:
+            if by == By.XPATH:
+                found = root.xpath(value)
+            elif by == By.TAG_NAME:
+                found = [element for element in root.iter(value) if element is not root]
+            elif by == By.CSS_SELECTOR:
+                found = root.cssselect(value)
+            else:
+                found = root.xpath(self.XPATH_LOCATORS[by], value=value)
+        except (KeyError, ImportError, ValueError) as err:
+            raise InvalidSelectorException(f'Locator {by}={value} is not supported by replay: {err}') from err
+        return [ReplayElement(element, self, (by, value)) for element in found
+                if isinstance(getattr(element, 'tag', None), str)]
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None, root=None) -> ReplayElement:  # noqa D102
+        found = self.find_elements(by, value, root=root)
+        if not found:
+            raise NoSuchElementException(f'Unable to locate element: {by}={value}')
+        return found[0]
+
+    def get_cookies(self) -> List[Dict[str, Any]]:  # noqa D102
+        return []
+
+    def add_cookie(self, cookie: Dict[str, Any]) -> None:  # noqa D102
+        pass
+
+    def delete_all_cookies(self) -> None:  # noqa D102
+        pass
+
+    def set_page_load_timeout(self, timeout: float) -> None:  # noqa D102
+        pass
+
+    def quit(self) -> None:  # noqa D102
+        self._documents.clear()
+
+
+def replay_bundle(path: str) -> Tuple[Dict[str, Union[int, float]], MemorySink]:
+    """
+    Run one parsing cycle on recorded bundle with settings and current time of recorded run.
+
+    Return stats of cycle (with time of recorded run) and sink with parsed accounts and transactions.
+    """
+    driver = ReplayDriver(path)
+    settings = driver.settings
+    sink = MemorySink()
+    # replayed pages are logged in already: bundle has no credentials
+    parser = get_parser_class(settings['bank'])(
+        login=settings['login'],
+        password='',  # nosec B106
+        transactions_interval=settings['transactions_interval'],
+        capture=settings['capture'],
+        main_page=settings['main_page'],
+        transaction_id_scheme=settings['transaction_id_scheme'],
+        sinks=[sink],
+        state=StateStore(),
+        driver=driver,
+        clock=lambda: driver.recorded_at,
+    )
+    try:
+        stats = parser.run_cycle(force=True)
+    finally:
+        parser.close()
+    stats['recorded_duration'] = driver.recorded_duration
+    return stats, sink
@@ -0,0 +1,118 @@
+"""
+Runtime for jobs of several banks in one process.
+
+Job is dict with "bank" (name of plugin in registry), "login", "password" and optional kwargs of bank client parser.
+Jobs share sinks, state and (if they are run one by one) web driver.
+"""
+
+import logging
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from py_parser_sber.abstract import (
+    AbstractClientParser,
+    AbstractSink,
+)
+from py_parser_sber.registry import get_parser_class
+from py_parser_sber.state import StateStore
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BANK = 'sberbank'
+
+
+def job_name(job: Dict[str, Any]) -> str:
+    """Get readable name of job."""
+    return f'{job.get("bank", DEFAULT_BANK)}:{job["login"]}'
+
+
+class Runtime:
+    """Create bank client parsers for jobs over shared browser, sinks and state."""
+
+    def __init__(self, jobs: Sequence[Dict[str, Any]], sinks: Sequence[AbstractSink], state: StateStore,
+                 **common_kwargs: Any):
+        self.jobs = list(jobs)
+        self.sinks = list(sinks)
+        self.state = state
+        self.common_kwargs = common_kwargs
+        self._driver = None
+
+    def _shared_driver(self, parser_class: type):
+        if self._driver is None:
+            self._driver = parser_class._prepare_webdriver()
+        return self._driver
+
+    def create_parser(self, job: Dict[str, Any], shared_browser: bool = False) -> AbstractClientParser:
+        """Create client parser of job bank. Bank plugin is imported here, on first use."""
+        job_kwargs = dict(job)
+        parser_class = get_parser_class(job_kwargs.pop('bank', DEFAULT_BANK))
+        kwargs = dict(self.common_kwargs, **job_kwargs)
+        kwargs.setdefault('sinks', self.sinks)
+        kwargs.setdefault('state', self.state)
+        if shared_browser:
+            kwargs['driver'] = self._shared_driver(parser_class)
+        return parser_class(**kwargs)
+
+    def run_job(self, job: Dict[str, Any]) -> Dict[str, Union[int, float]]:
+        """Run one iteration of job on shared browser."""
+        logger.info(f'Start job {job_name(job)}...')
+        parser = self.create_parser(job, shared_browser=True)
+        try:
+            return parser.run_cycle()
+        except Exception:
+            self._drop_dead_driver()
+            raise
+        finally:
+            self._close_parser(parser)
+
+    def _close_parser(self, parser: AbstractClientParser) -> None:
+        try:
+            parser.close()
+        except Exception:
+            # shared browser can be left logged in, so next job must not get it
+            logger.warning('Parser is not closed gracefully. Shared web driver will be created again', exc_info=True)
+            self._quit_driver()
+
+    def run_all(self) -> None:
+        """Run every job one by one. Error of one job does not stop others, but raised after all."""
+        error: Optional[Exception] = None
+        for job in self.jobs:
+            try:
+                self.run_job(job)
+            except Exception as err:
+                logger.exception(f'Job {job_name(job)} failed: {err}')
+                error = error or err
+        if error is not None:
+            raise error
+
+    def _drop_dead_driver(self) -> None:
+        if self._driver is None:
+            return
+        try:
+            self._driver.current_url
+        except Exception:
+            logger.info('Shared web driver is not responding and will be created again')
+            self._quit_driver()
+
+    def _quit_driver(self) -> None:
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                logger.debug('Web driver is already closed', exc_info=True)
+            self._driver = None
+
+    def close(self) -> None:
+        """Close shared browser and sinks."""
+        self._quit_driver()
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as err:
+                logger.exception(f'{sink!r} is not closed: {err}')
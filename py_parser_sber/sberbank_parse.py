@@ -6,19 +6,39 @@ Using two type of Sberbank Accounts (card account and bank account), Sberbank Tr
 
 import datetime
 import logging
+import re
+import time
+from collections import (
+    Counter,
+    namedtuple,
+)
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
+from functools import partial
 from typing import (
+    Any,
+    Callable,
     Dict,
+    Generator,
+    Iterable,
     Iterator,
+    List,
     Optional,
     Sequence,
+    Tuple,
     Type,
     Union,
 )
+from urllib.parse import (
+    urlencode,
+    urlparse,
+)
 
 from selenium.common.exceptions import (
     NoSuchElementException,
+    StaleElementReferenceException,
     TimeoutException as SeleniumTimeoutException,
+    WebDriverException,
 )
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webdriver import WebDriver
@@ -30,21 +50,84 @@ from py_parser_sber.abstract import (
     AbstractAccount,
     AbstractClientParser,
     AbstractTransaction,
+    SessionExpiredError,
     TIMEOUT,
     Transaction,
 )
+from py_parser_sber.capture import (
+    capture_transactions,
+    install_recorder,
+    parse_accounts_html,
+)
+from py_parser_sber.throttle import (
+    RateLimiter,
+    throttled,
+)
 from py_parser_sber.utils import (
     Retry,
     check_authorization,
     currency_converter,
+    detect_date_format,
     get_query_attr,
     replace_formatter,
     sber_time_format,
+    split_evenly,
 )
 
 
 logger = logging.getLogger(__name__)
 
+# reader of rows of every page with transactions: (driver, transactions_table, capture) -> pages rows
+PagesReader = Callable[[WebDriver, WebElement, bool], Iterator[List[List[str]]]]
+
+# request of page of transactions paginator. Learned from going to second page for jump to any page
+PageRequest = namedtuple('PageRequest', ['action', 'method', 'fields', 'page_field', 'first_offset', 'step'])
+
+
+class PageRequestError(WebDriverException):
+    """Learned request of paginator opened other page, than requested one."""
+
+
+# exit link of sberbank-online, which closes session on server side
+LOGOUT_LINK_XPATH = "//a[contains(@href, 'logoff') or contains(@class, 'logout') or normalize-space(.)='Выход']"
+
+# direct visits of page from navigation map are stopped after this number of stale entries in a row,
+# and tried again after STALE_NAVIGATION_TTL seconds
+MAX_STALE_NAVIGATIONS = 3
+STALE_NAVIGATION_TTL = 24 * 60 * 60
+
+# request, which is sent by transactions filter form. Learned once per session for deep links to history pages
+FilterRequest = namedtuple('FilterRequest', ['action', 'method', 'fields', 'account_field', 'date_fields',
+                                             'date_format'])
+
+SERIALIZE_FORM_JS = """
+var form = arguments[0].tagName === 'FORM' ? arguments[0] : arguments[0].closest('form');
+if (!form) { return null; }
+var fields = [];
+for (var i = 0; i < form.elements.length; i++) {
+    var el = form.elements[i];
+    if (!el.name || el.disabled || ['submit', 'button', 'file', 'reset'].indexOf(el.type) !== -1) { continue; }
+    if ((el.type === 'checkbox' || el.type === 'radio') && !el.checked) { continue; }
+    fields.push([el.name, el.value]);
+}
+return {action: form.action, method: (form.getAttribute('method') || 'get').toLowerCase(), fields: fields};
+"""
+
+SUBMIT_POST_JS = """
+var form = document.createElement('form');
+form.method = 'post';
+form.action = arguments[0];
+arguments[1].forEach(function (field) {
+    var input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = field[0];
+    input.value = field[1];
+    form.appendChild(input);
+});
+document.body.appendChild(form);
+form.submit();
+"""
+
 
 class AbstractSberbankAccount(AbstractAccount):  # noqa H601
     """Abstract implementation of AbstractAccount for Sberbank."""
@@ -55,9 +138,13 @@ class AbstractSberbankAccount(AbstractAccount):  # noqa H601
         name = raw_account.find_element(By.XPATH, './/span[contains(@class, "titleBlock")]').get_attribute('title')
 
         url = raw_account.find_element(By.XPATH, './/div[contains(@class, "pruductImg")]/a').get_attribute("href")
-        account_id = get_query_attr(url, 'id')
-
         raw_funds = raw_account.find_element(By.XPATH, './/span[contains(@class, "overallAmount")]').text
+        return cls.from_raw(name=name, url=url, raw_funds=raw_funds)
+
+    @classmethod
+    def from_raw(cls, name: str, url: str, raw_funds: str) -> 'AbstractSberbankAccount':
+        """Create SberbankAccount from raw strings, got from DOM or from captured page."""
+        account_id = get_query_attr(url, 'id')
         raw_funds, raw_currency = raw_funds.rsplit(' ', 1)
 
         # prepare parsed data
@@ -83,9 +170,18 @@ class SberbankTransaction(AbstractTransaction):  # noqa H601
 
     @classmethod
     def transaction_parser(
-            cls, driver: WebDriver, account: AbstractAccount
+            cls, driver: WebDriver, account: AbstractAccount, capture: bool = False,
+            pages_reader: Optional[PagesReader] = None, id_scheme: str = 'legacy',
+            rate_limiter: Optional[RateLimiter] = None, today: Optional[datetime.date] = None
     ) -> Iterator[Optional['SberbankTransaction']]:
-        """Parse Sberbank transaction."""
+        """
+        Parse Sberbank transaction.
+
+        If capture is set, every page of transactions is parsed from captured response. Unrecognized one - from DOM.
+        Pages are read by pages_reader (one by one, by default). Rows of all pages are grouped by day in page order.
+        With content id scheme transactions are yielded without waiting for other transactions of their day.
+        Relative dates ("Сегодня", "Вчера", date without year) are counted from today (current date by default).
+        """
         transactions_table = driver.find_element(By.ID, 'simpleTable0')
 
         with suppress(NoSuchElementException):
@@ -93,74 +189,157 @@ class SberbankTransaction(AbstractTransaction):  # noqa H601
             logger.info(f'Not found new transactions for account {account.name}')
             return
 
+        if capture:
+            # history page can be loaded without get (filter form, deep link), so recorder can be not installed
+            install_recorder(driver)
+
         if driver.find_element(By.ID, 'pagination').is_displayed():
             # Many transactions. Increase the number of elements per page
-            driver.find_elements(By.XPATH, "//span[contains(@class, 'paginationSize')]")[-1].click()
+            with throttled(rate_limiter):
+                driver.find_elements(By.XPATH, "//span[contains(@class, 'paginationSize')]")[-1].click()
             transactions_table = driver.find_element(By.ID, 'simpleTable0')
 
-        while True:
-            curr_day_transactions = []
-            prev_transaction_data = cls._transaction_time_parse('Сегодня')
-
-            for transaction_el in transactions_table.find_elements(By.XPATH, ".//tr[contains(@class, 'ListLine')]"):
-                raw_info = [i.text for i in transaction_el.find_elements(By.XPATH, "./td")]
-                curr_transaction_date = cls._transaction_time_parse(raw_info[3])
-                raw_cost, raw_currency = raw_info[4].rsplit(' ', 1)
-
-                raw_transaction = {
-                    'account_name': account.name,
-                    'tr_time': curr_transaction_date,
-                    'cost': replace_formatter(raw_cost, delete_symbols=' ', custom={',': '.'}),
-                    'currency': currency_converter(raw_currency),
-                    'description': raw_info[0].rsplit('\n', 1)[0],
-                }
-
-                if prev_transaction_data == curr_transaction_date:
-                    logger.debug(f'add to {curr_transaction_date} transaction {raw_transaction}')
-                    curr_day_transactions.append(raw_transaction)
-                else:
-                    logger.debug(f'return transactions {curr_day_transactions} for {prev_transaction_data}')
-                    yield from cls._add_custom_unique_tr_id(curr_day_transactions)
-                    curr_day_transactions.clear()
-                    prev_transaction_data = curr_transaction_date
-                    logger.debug(f'add to {curr_transaction_date} transaction {raw_transaction}')
-                    curr_day_transactions.append(raw_transaction)
-
-            paginator = transactions_table.find_element(By.ID, 'pagination')
-            if paginator.is_displayed():
-                # go to next page
-                paginator_next = paginator.find_elements(By.XPATH, ".//table[contains(@class, 'tblPagin')]//td")[2]
-
-                with suppress(NoSuchElementException):
-                    # if only one page with transaction results - be error here. Ignoring...
-                    button = paginator_next.find_element(By.XPATH, ".//div[contains(@class, 'activePaginRightArrow')]")
-
-                    if button.get_attribute('class').startswith('inactive'):
-                        # if last page
-                        logger.debug(f'return transactions {curr_day_transactions} for {prev_transaction_data}')
-                        yield from cls._add_custom_unique_tr_id(curr_day_transactions)
-                        break
-
-                    button.click()
-
-                    def wait_new_table():
-                        # waiting new page with transactions
-                        WebDriverWait(driver, TIMEOUT).until(
-                            expected_conditions.presence_of_element_located((By.ID, 'simpleTable0')))
-
-                    retry = Retry(
-                        function=wait_new_table,
-                        error=SeleniumTimeoutException,
-                        err_msg=(f'Error. WebDriver not found page with new transactions for timeout {TIMEOUT}.'
-                                 ' Please, check your network connection'),
-                        max_attempts=3
-                    )
-                    retry()
-            else:
-                logger.debug(f'return transactions {curr_day_transactions} for {prev_transaction_data}')
+        pages_reader = pages_reader or partial(cls.read_pages, rate_limiter=rate_limiter)
+        rows = (raw_info for page_rows in pages_reader(driver, transactions_table, capture) for raw_info in page_rows)
+        yield from cls._group_by_day(account, rows, id_scheme, today or datetime.date.today())
+
+    @classmethod
+    def _group_by_day(cls, account: AbstractAccount, rows: Iterable[List[str]], id_scheme: str,
+                      today: datetime.date) -> Iterator['SberbankTransaction']:
+        curr_day_transactions: List[Dict[str, Union[str, int]]] = []
+        # number of same transactions, which are already read in current day
+        curr_day_occurrences: Counter = Counter()
+        prev_transaction_data = cls._transaction_time_parse('Сегодня', today)
+
+        for raw_info in rows:
+            raw_transaction = cls._raw_transaction(account, raw_info, today)
+            curr_transaction_date = raw_transaction['tr_time']
+
+            if prev_transaction_data != curr_transaction_date:
+                logger.debug('return %d transactions for %s', len(curr_day_transactions), prev_transaction_data)
                 yield from cls._add_custom_unique_tr_id(curr_day_transactions)
+                curr_day_transactions = []
+                curr_day_occurrences.clear()
+                prev_transaction_data = curr_transaction_date
+
+            # per-row record: lazy formatting with immutable arguments, sampled by SamplingFilter
+            logger.debug('add to %s transaction %s', curr_transaction_date, raw_info, extra={'sample': True})
+            if id_scheme != 'legacy':
+                content = tuple(raw_transaction.values())
+                curr_day_occurrences[content] += 1
+                raw_transaction['occurrence'] = curr_day_occurrences[content]
+            if id_scheme == 'content':
+                # id does not depend on other transactions of the day, so there is no need to wait for them
+                yield cls(order_id=None, **raw_transaction)
+                continue
+            curr_day_transactions.append(raw_transaction)
+
+        logger.debug('return %d transactions for %s', len(curr_day_transactions), prev_transaction_data)
+        yield from cls._add_custom_unique_tr_id(curr_day_transactions)
+
+    @classmethod
+    def read_pages(cls, driver: WebDriver, transactions_table: WebElement, capture: bool = False,
+                   rate_limiter: Optional[RateLimiter] = None) -> Iterator[List[List[str]]]:
+        """Read rows of pages one by one, going to next page by click."""
+        while True:
+            yield cls.page_rows(driver, transactions_table, capture)
+            if not cls.next_page(driver, transactions_table, rate_limiter):
                 break
 
+    @classmethod
+    def page_rows(cls, driver: WebDriver, transactions_table: WebElement, capture: bool = False) -> List[List[str]]:
+        """
+        Read rows of current page of transactions: from captured response or from DOM.
+
+        In capture mode, recorder is installed again after reading: paginator can reload the page.
+        """
+        rows = None
+        if capture:
+            rows = capture_transactions(driver)
+            install_recorder(driver)
+        if rows is None:
+            rows = cls._dom_rows(transactions_table)
+        return rows
+
+    @staticmethod
+    def _paginator_cells(transactions_table: WebElement) -> Optional[List[WebElement]]:
+        paginator = transactions_table.find_element(By.ID, 'pagination')
+        if not paginator.is_displayed():
+            return None
+        return paginator.find_elements(By.XPATH, ".//table[contains(@class, 'tblPagin')]//td")
+
+    @classmethod
+    def total_pages(cls, transactions_table: WebElement) -> Optional[int]:
+        """
+        Get last page number, visible in paginator. None, if it is not found.
+
+        Paginator shows window of pages around current one, so it is not always total number of pages.
+        """
+        cells = cls._paginator_cells(transactions_table)
+        if not cells or len(cells) < 3:
+            return None
+        numbers = [int(number) for number in re.findall(r'\d+', cells[1].text)]
+        return max(numbers) if numbers else None
+
+    @classmethod
+    def next_page(cls, driver: WebDriver, transactions_table: WebElement,
+                  rate_limiter: Optional[RateLimiter] = None) -> bool:
+        """Go to next page by click. Return False, if it's last page."""
+        cells = cls._paginator_cells(transactions_table)
+        if not cells:
+            return False
+
+        try:
+            button = cells[2].find_element(By.XPATH, ".//div[contains(@class, 'activePaginRightArrow')]")
+        except NoSuchElementException:
+            # only one page with transaction results
+            return False
+
+        if button.get_attribute('class').startswith('inactive'):
+            # if last page
+            return False
+
+        def wait_new_table():
+            # waiting new page with transactions
+            WebDriverWait(driver, TIMEOUT).until(
+                expected_conditions.presence_of_element_located((By.ID, 'simpleTable0')))
+
+        retry = Retry(
+            function=wait_new_table,
+            error=SeleniumTimeoutException,
+            err_msg=(f'Error. WebDriver not found page with new transactions for timeout {TIMEOUT}.'
+                     ' Please, check your network connection'),
+            max_attempts=3
+        )
+        # waiting and backoff of retry do not hold slot of rate limiter
+        with throttled(rate_limiter):
+            button.click()
+        try:
+            retry()
+        except SeleniumTimeoutException:
+            if rate_limiter is not None:
+                rate_limiter.report(TIMEOUT, error=True)
+            raise
+        return True
+
+    @staticmethod
+    def _dom_rows(transactions_table: WebElement) -> List[List[str]]:
+        """Get texts of cells of every transaction row, element by element."""
+        return [[i.text for i in transaction_el.find_elements(By.XPATH, "./td")]
+                for transaction_el in transactions_table.find_elements(By.XPATH, ".//tr[contains(@class, 'ListLine')]")]
+
+    @classmethod
+    def _raw_transaction(cls, account: AbstractAccount, raw_info: Sequence[str],
+                         today: datetime.date) -> Dict[str, Union[str, int]]:
+        raw_cost, raw_currency = raw_info[4].rsplit(' ', 1)
+        return {
+            'account_name': account.name,
+            'tr_time': cls._transaction_time_parse(raw_info[3], today),
+            'cost': replace_formatter(raw_cost, delete_symbols=' ', custom={',': '.'}),
+            'currency': currency_converter(raw_currency),
+            'description': raw_info[0].rsplit('\n', 1)[0],
+        }
+
     @classmethod
     def _add_custom_unique_tr_id(cls, raw_tr_list: Sequence[Dict[str, Union[str, int]]]) -> Transaction:
         for order_id, curr_day_raw_tr in enumerate(reversed(raw_tr_list), 1):
@@ -170,11 +349,11 @@ class SberbankTransaction(AbstractTransaction):  # noqa H601
             yield cls(**raw_tr)
 
     @staticmethod
-    def _transaction_time_parse(raw_time: str) -> str:
+    def _transaction_time_parse(raw_time: str, today: datetime.date) -> str:
         if raw_time == 'Сегодня':
-            time = datetime.date.today()
+            time = today
         elif raw_time == 'Вчера':
-            time = datetime.date.today() - datetime.timedelta(days=1)
+            time = today - datetime.timedelta(days=1)
         else:
             try:
                 raw_time_tuple = tuple(map(int, raw_time.split('.')))
@@ -184,8 +363,7 @@ class SberbankTransaction(AbstractTransaction):  # noqa H601
             else:
                 headers = ['day', 'month', 'year']
                 dict_time = dict(zip(headers, raw_time_tuple))
-                curr_year = datetime.date.today().year
-                dict_time.setdefault('year', curr_year)
+                dict_time.setdefault('year', today.year)
                 time = datetime.date(**dict_time)
         return f'{time:%Y.%m.%d}'
 
@@ -195,12 +373,35 @@ class SberbankClientParser(AbstractClientParser):  # noqa H601
 
     main_page = "https://online.sberbank.ru/"
 
-    def __init__(self, **kwargs):
+    def __init__(self, pagination_workers: int = 0, **kwargs):
         self.main_menu_link = None
+        self.pagination_workers = pagination_workers
+        self._page_drivers: List[WebDriver] = []
+        self._history_link: Optional[str] = None
+        self._filter_request: Optional[FilterRequest] = None
+        self._deep_links_enabled = True
+        self._page_requests_enabled = True
         super(SberbankClientParser, self).__init__(**kwargs)
 
+    @property
+    def is_authenticated(self) -> bool:
+        """
+        Sberbank-online session is logged in, if main menu link was got after auth.
+
+        Expiry of session on server side is found on navigation (see _check_session).
+        """
+        return self.main_menu_link is not None
+
+    def _check_session(self) -> None:
+        """Raise SessionExpiredError, if bank redirected to login page."""
+        if self.driver.find_elements(By.ID, 'loginByLogin'):
+            raise SessionExpiredError(f'Login page is opened instead of {self.driver.current_url}')
+
     def auth(self) -> None:
         """Autheticate in sberbank-online."""
+        self._filter_request = None
+        self._deep_links_enabled = True
+        self._page_requests_enabled = True
         self.get(self.main_page)
 
         def wait_auth_form():
@@ -232,16 +433,70 @@ class SberbankClientParser(AbstractClientParser):  # noqa H601
         self.wait_click_redirect(form_button)
         self.main_menu_link = self.driver.current_url
 
-    @check_authorization
-    def _account_page_parser(self, text: str, account: Type[AbstractSberbankAccount]) -> None:
+    @property
+    def _navigation_map(self) -> Dict[str, Dict[str, Union[str, int, float]]]:
+        return self.state.section(f'navigation:{type(self).__name__}:{self.login}')
+
+    def _is_expected_page(self, url: str, page_locator: Optional[Tuple[str, str]]) -> bool:
+        # expired or wrong url is redirected to other page (login, main menu, error)
+        if urlparse(self.driver.current_url).path != urlparse(url).path:
+            return False
+        return page_locator is None or bool(self.driver.find_elements(*page_locator))
+
+    @staticmethod
+    def _is_direct_visit_allowed(entry: Dict[str, Union[str, int, float]]) -> bool:
+        # url of page can become stable again after changes of bank site
+        return entry['stale'] < MAX_STALE_NAVIGATIONS or time.time() - entry.get('stale_at', 0) >= STALE_NAVIGATION_TTL
+
+    def _navigate(self, target: str, link_locator: Tuple[str, str],
+                  page_locator: Optional[Tuple[str, str]] = None) -> None:
+        """
+        Go to page, which is linked from main menu.
+
+        Resolved url of page is remembered in navigation map, and next visits go to it directly.
+        If page is not expected, entry is dropped and page is resolved from main menu again.
+        After MAX_STALE_NAVIGATIONS drops in a row (url is unique for session), direct visits of target are stopped
+        for STALE_NAVIGATION_TTL. Redirect to login page is expired session, not stale entry.
+        """
+        entry = self._navigation_map.get(target)
+        stale, stale_at = 0, 0.0
+        if entry is not None and self._is_direct_visit_allowed(entry):
+            self.get(entry['url'])
+            if self._is_expected_page(entry['url'], page_locator):
+                if entry['stale']:
+                    with self.state.lock:
+                        entry['stale'] = 0
+                        self.state.save()
+                return
+            self._check_session()
+            stale, stale_at = entry['stale'] + 1, time.time()
+            logger.info(f'Navigation map entry "{target}" is stale and dropped')
+        elif entry is not None:
+            stale, stale_at = entry['stale'], entry.get('stale_at', 0.0)
+
         # go to main page
         self.get(self.main_menu_link)
+        self._check_session()
 
-        # go to page with funds
-        link = self.driver.find_element(By.PARTIAL_LINK_TEXT, text)
+        # go to target page
+        link = self.driver.find_element(*link_locator)
         self.wait_click_redirect(link)
+        with self.state.lock:
+            self._navigation_map[target] = {'url': self.driver.current_url, 'stale': stale, 'stale_at': stale_at}
+            self.state.save()
+
+    @check_authorization
+    def _account_page_parser(self, text: str, account: Type[AbstractSberbankAccount]) -> None:
+        # go to page with funds
+        self._navigate(target=text, link_locator=(By.PARTIAL_LINK_TEXT, text))
 
         # get info about every funds
+        captured_accounts = parse_accounts_html(self.driver.page_source) if self.capture else None
+        if captured_accounts is not None:
+            for captured_account in captured_accounts:
+                self._container[account.from_raw(**captured_account)] = []
+            return
+
         raw_accounts = self.driver.find_elements(By.XPATH, "//div[contains(@class, 'productCover')]")
         for raw_account in raw_accounts:
             parsed_account = account.account_parser(raw_account)
@@ -265,25 +520,296 @@ class SberbankClientParser(AbstractClientParser):  # noqa H601
     @check_authorization
     def transactions_pages_parser(self) -> None:
         """Parse transaction from search transactions page."""
-        # go to main page
-        self.get(self.main_menu_link)
+        accounts = self.accounts_for_transactions_check()
+        if not accounts:
+            logger.info('No accounts for transactions search')
+            return
 
         # go to page with transactions history
         text = 'История операций'
         transaction_form_template = ("//ul[contains(@class, 'linksList')]/li/a/div[contains(@class, 'greenTitle')]/"
                                      f"span[contains(text(), '{text}')]")
-        link = self.driver.find_element(By.XPATH, transaction_form_template)
-        self.wait_click_redirect(link)
+        self._navigate(target=text, link_locator=(By.XPATH, transaction_form_template),
+                       page_locator=(By.CLASS_NAME, 'filterMore'))
+        self._history_link = self.driver.current_url
 
-        for account in self._container.keys():
-            # fill form for transaction search
-            self._transaction_form_filter(account)
+        for account in accounts:
+            # open filtered history page directly, if filter request is learned. Else fill form for transaction search
+            if not self._deep_link_filter(account):
+                self._transaction_form_filter(account)
 
             # pass data from form to transaction parser
-            transaction_iterator = SberbankTransaction.transaction_parser(self.driver, account)
+            pages_reader = self._parallel_pages if self.pagination_workers > 0 and self._page_requests_enabled else None
+            transaction_iterator = SberbankTransaction.transaction_parser(
+                self.driver, account, capture=self.capture, pages_reader=pages_reader,
+                id_scheme=self.transaction_id_scheme, rate_limiter=self.rate_limiter, today=self.clock().date())
             for transaction_item in transaction_iterator:
                 self._container[account].append(transaction_item)
 
+    @staticmethod
+    def _account_value(account: AbstractAccount) -> str:
+        # sberbank account id in format "type:id"
+        return f'{account.acc_type}:{account.account_id}'
+
+    def _filter_dates(self, account: AbstractAccount) -> Tuple[datetime.datetime, datetime.datetime]:
+        return self.transactions_from_date(account), self.clock()
+
+    def _serialize_form(self, element: WebElement, driver: Optional[WebDriver] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return (driver or self.driver).execute_script(SERIALIZE_FORM_JS, element)
+        except WebDriverException:
+            logger.debug('Filter form is not serialized', exc_info=True)
+            return None
+
+    @staticmethod
+    def _find_filter_fields(fields: List[Tuple[str, str]], acc_value: str,
+                            dates: Tuple[datetime.datetime, datetime.datetime]) -> Optional[Tuple[str, str, str]]:
+        """Find names of account, from date and to date fields by their values. None, if some of them is not found."""
+        account_field = next((name for name, value in fields if value == acc_value), None)
+        from_field = next((name for name, value in fields if detect_date_format(value, dates[0])), None)
+        to_field = next((name for name, value in fields if detect_date_format(value, dates[1])), None)
+        if account_field is None or from_field is None or to_field is None:
+            return None
+        return account_field, from_field, to_field
+
+    def _learn_filter_request(self, filter_form: WebElement, acc_value: str,
+                              dates: Tuple[datetime.datetime, datetime.datetime]) -> Optional[FilterRequest]:
+        """Find fields of filled filter form with account and dates, to repeat the request with other values."""
+        if dates[0].date() == dates[1].date():
+            # from and to fields have same values, so they can't be told apart
+            logger.debug('Dates of filter are in one day. Request of transactions filter form is not learned')
+            return None
+
+        form = self._serialize_form(filter_form)
+        if not form or form['method'] not in ('get', 'post'):
+            return None
+
+        found_fields = self._find_filter_fields(form['fields'], acc_value, dates)
+        if found_fields is None:
+            logger.info('Request of transactions filter form is not recognized')
+            return None
+
+        account_field, from_field, to_field = found_fields
+        date_format = detect_date_format(dict(form['fields'])[from_field], dates[0])
+        logger.info(f'Request of transactions filter form is learned: {form["method"].upper()} {form["action"]}')
+        return FilterRequest(action=form['action'], method=form['method'], fields=form['fields'],
+                             account_field=account_field, date_fields=(from_field, to_field), date_format=date_format)
+
+    def _is_filtered_page(self, values: Dict[str, str]) -> bool:
+        """Check, that filter form of history page is filled with requested account and dates."""
+        form = None
+        with suppress(NoSuchElementException):
+            form = self._serialize_form(self.driver.find_element(By.CLASS_NAME, 'filterMore'))
+        if form is None:
+            return False
+        landed_values = dict(form['fields'])
+        return all(landed_values.get(field) == value for field, value in values.items())
+
+    def _deep_link_filter(self, account: AbstractAccount) -> bool:
+        """Open filtered history page by learned request. Return False, if request is not learned or failed."""
+        request = self._filter_request
+        if request is None:
+            return False
+
+        new_values = {request.account_field: self._account_value(account)}
+        for field, date in zip(request.date_fields, self._filter_dates(account)):
+            new_values[field] = format(date, request.date_format)
+        fields = [(name, new_values.get(name, value)) for name, value in request.fields]
+
+        try:
+            self._submit_request(self.driver, request.action, request.method, fields)
+        except WebDriverException:
+            logger.debug('Deep link is not opened', exc_info=True)
+        else:
+            # check, that history page is filtered by requested account and dates
+            if self._is_filtered_page(new_values):
+                logger.info(f'Filtered history page of account {account.name} is opened by deep link')
+                return True
+            self._check_session()
+
+        logger.info('Deep link to filtered history page failed. Fall back to filter form until new session')
+        self._filter_request = None
+        self._deep_links_enabled = False
+        self.get(self._history_link)
+        return False
+
+    def _submit_request(self, driver: WebDriver, action: str, method: str, fields: List[Tuple[str, str]]) -> None:
+        """Send learned request and wait new table with transactions."""
+        old_table = self._transactions_table_state(driver)
+        with throttled(self.rate_limiter):
+            if method == 'get':
+                # like browser, form data replaces query of action
+                driver.get(urlparse(action)._replace(query=urlencode(fields)).geturl())
+            else:
+                driver.execute_script(SUBMIT_POST_JS, action, fields)
+            self._wait_transactions_table(old_table, driver)
+
+    def _find_transactions_table(self, driver: Optional[WebDriver] = None) -> Optional[WebElement]:
+        with suppress(NoSuchElementException):
+            return (driver or self.driver).find_element(By.ID, 'simpleTable0')
+        return None
+
+    def _transactions_table_state(self, driver: Optional[WebDriver] = None) -> Tuple[Optional[WebElement], str]:
+        """Get table with transactions and its text before filter or page request, to wait its change."""
+        table = self._find_transactions_table(driver)
+        return table, ('' if table is None else table.text)
+
+    def _wait_transactions_table(self, old_table: Tuple[Optional[WebElement], str],
+                                 driver: Optional[WebDriver] = None) -> None:
+        """Wait new table with transactions after filter or page request: new element or new text of old one."""
+        table, text = old_table
+
+        def is_new_table(current_driver: WebDriver) -> bool:
+            if self._find_transactions_table(current_driver) is None:
+                return False
+            if table is None:
+                return True
+            try:
+                # table can be updated in place
+                return table.text != text
+            except StaleElementReferenceException:
+                return True
+
+        WebDriverWait(driver or self.driver, TIMEOUT).until(is_new_table)
+
+    @staticmethod
+    def _learn_page_request(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Optional[PageRequest]:
+        """Find numeric field of paginator form, which is changed by going from first page to second one."""
+        if not before or not after:
+            return None
+        before_values = dict(before['fields'])
+        for name, value in after['fields']:
+            old_value = before_values.get(name, '')
+            if old_value != value and old_value.isdigit() and value.isdigit():
+                return PageRequest(action=after['action'], method=after['method'], fields=after['fields'],
+                                   page_field=name, first_offset=int(old_value), step=int(value) - int(old_value))
+        return None
+
+    def _get_page_drivers(self, count: int) -> List[WebDriver]:
+        """Get browsers for parallel reading of pages. They are created once per session, and again after death."""
+        for page_driver in self._page_drivers[:]:
+            try:
+                page_driver.current_url
+            except Exception:
+                logger.info('Page browser is not responding and will be created again')
+                self._drop_page_driver(page_driver)
+        while len(self._page_drivers) < count:
+            self._page_drivers.append(self._prepare_webdriver())
+        return self._page_drivers[:count]
+
+    def _drop_page_driver(self, page_driver: WebDriver) -> None:
+        with suppress(ValueError):
+            self._page_drivers.remove(page_driver)
+        with suppress(Exception):
+            page_driver.quit()
+
+    def _sync_cookies(self, page_driver: WebDriver, url: str) -> None:
+        """Log in page browser by cookies of main browser."""
+        target = urlparse(url)
+        if urlparse(page_driver.current_url).netloc != target.netloc:
+            # cookies can be added only for domain of current page
+            page_driver.get(f'{target.scheme}://{target.netloc}/favicon.ico')
+        page_driver.delete_all_cookies()
+        for cookie in self.driver.get_cookies():
+            page_driver.add_cookie({k: v for k, v in cookie.items() if k in ('name', 'value', 'path', 'secure')})
+
+    def _read_pages_by_request(self, driver: WebDriver, request: PageRequest, pages: Sequence[int],
+                               capture: bool) -> Tuple[List[List[List[str]]], int]:
+        """
+        Jump to every page by learned request and read it. Return rows of pages and last page, visible after.
+
+        Raise PageRequestError, if paginator form of opened page is not of requested page.
+        """
+        self._sync_cookies(driver, request.action)
+
+        pages_rows = []
+        transactions_table = None
+        for page in pages:
+            offset = str(request.first_offset + (page - 1) * request.step)
+            fields = [(name, offset if name == request.page_field else value) for name, value in request.fields]
+            self._submit_request(driver, request.action, request.method, fields)
+            transactions_table = driver.find_element(By.ID, 'simpleTable0')
+            # learned field can be a counter of requests or a timestamp, not a page
+            form = self._serialize_form(transactions_table, driver)
+            if form is None or dict(form['fields']).get(request.page_field) != offset:
+                raise PageRequestError(f'Page {page} is not opened by learned request')
+            pages_rows.append(SberbankTransaction.page_rows(driver, transactions_table, capture))
+        return pages_rows, SberbankTransaction.total_pages(transactions_table) or pages[-1]
+
+    def _read_pages_window(self, driver: WebDriver, transactions_table: WebElement, request: PageRequest,
+                           pages: List[int], capture: bool) -> Generator[List[List[str]], None, Optional[int]]:
+        """
+        Read pages by page browsers in parallel: every browser reads contiguous range of pages.
+
+        If page browser failed, pages from its range to the end are read by click in main browser, which stays
+        on second page, and None is returned. Otherwise, return last page, visible after last page of window.
+        Wrong learned request turns off parallel reading of pages until new session.
+        """
+        chunks = split_evenly(pages, self.pagination_workers)
+        logger.info(f'Read pages {pages[0]}-{pages[-1]} of transactions by {len(chunks)} sessions')
+        page_drivers = self._get_page_drivers(len(chunks))
+        last_page = pages[-1]
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = [executor.submit(self._read_pages_by_request, page_driver, request, chunk, capture)
+                       for page_driver, chunk in zip(page_drivers, chunks)]
+            for page_driver, chunk, future in zip(page_drivers, chunks, futures):
+                try:
+                    pages_rows, last_page = future.result()
+                except Exception as err:
+                    logger.warning(f'Pages {chunk[0]}-{chunk[-1]} are not read in parallel: {err}. '
+                                   f'Read pages from {chunk[0]} one by one by main session')
+                    if isinstance(err, PageRequestError):
+                        self._page_requests_enabled = False
+                    self._drop_page_driver(page_driver)
+                    break
+                yield from pages_rows
+            else:
+                return last_page
+            for other_future in futures:
+                other_future.cancel()
+            # the same request is not repeated in main browser: it can be wrong
+            yield from self._read_pages_by_click(driver, transactions_table, chunk[0], capture)
+        return None
+
+    def _read_pages_by_click(self, driver: WebDriver, transactions_table: WebElement, first_page: int,
+                             capture: bool) -> Iterator[List[List[str]]]:
+        """Read pages from first_page to the end by click, starting from second page."""
+        for _ in range(first_page - 3):
+            if not SberbankTransaction.next_page(driver, transactions_table, self.rate_limiter):
+                return
+        while SberbankTransaction.next_page(driver, transactions_table, self.rate_limiter):
+            yield SberbankTransaction.page_rows(driver, transactions_table, capture)
+
+    def _parallel_pages(self, driver: WebDriver, transactions_table: WebElement,
+                        capture: bool = False) -> Iterator[List[List[str]]]:
+        """
+        Read rows of pages by several browser sessions.
+
+        First two pages are read by click, and request of page is learned from them.
+        Pages, visible in paginator, are split to contiguous ranges, and every page browser jumps to pages of his range
+        by request. Paginator of last page shows next window of pages, which are read the same way.
+        If page is not read by request, the rest of pages are read by click.
+        Pages are yielded in order, so day groups of transactions stay correct across pages.
+        """
+        yield SberbankTransaction.page_rows(driver, transactions_table, capture)
+        last_page = SberbankTransaction.total_pages(transactions_table)
+        before = self._serialize_form(transactions_table)
+        if not SberbankTransaction.next_page(driver, transactions_table, self.rate_limiter):
+            return
+        yield SberbankTransaction.page_rows(driver, transactions_table, capture)
+
+        request = self._learn_page_request(before, self._serialize_form(driver.find_element(By.ID, 'simpleTable0')))
+        if request is None or last_page is None:
+            logger.info('Request of transactions page is not learned. Read pages one by one')
+            yield from self._read_pages_by_click(driver, transactions_table, 3, capture)
+            return
+
+        first_page = 3
+        while last_page is not None and first_page <= last_page:
+            window = list(range(first_page, last_page + 1))
+            first_page = last_page + 1
+            last_page = yield from self._read_pages_window(driver, transactions_table, request, window, capture)
+
     def _transaction_form_filter(self, account: AbstractAccount):
         # show filter popup if it hidden
         if not self.driver.find_element(By.CLASS_NAME, 'filterMore').is_displayed():
@@ -293,9 +819,7 @@ class SberbankClientParser(AbstractClientParser):  # noqa H601
         filter_form = self.driver.find_element(By.CLASS_NAME, 'filterMore')
 
         # get sberbank account id in format "type:id"
-        acc_type = account.acc_type
-        acc_id = account.account_id
-        acc_value = f'{acc_type}:{acc_id}'
+        acc_value = self._account_value(account)
 
         # choose account for search
         filter_form.find_element(By.ID, 'customSelect1').click()  # create account selection
@@ -303,8 +827,7 @@ class SberbankClientParser(AbstractClientParser):  # noqa H601
         sel.click()
 
         # choose datetime interval
-        to_date = datetime.datetime.now()
-        from_date = to_date - datetime.timedelta(seconds=self.transactions_interval)
+        from_date, to_date = self._filter_dates(account)
 
         from_date_field = filter_form.find_element(By.ID, 'filter(fromDate)')
         from_date_field.clear()
@@ -323,9 +846,46 @@ class SberbankClientParser(AbstractClientParser):  # noqa H601
         text = 'Применить'
         transaction_form_button_xpath = (".//div[contains(@class, 'commandButton')]//"
                                          f"span[contains(text(), '{text}')]")
-        filter_form.find_element(By.XPATH, transaction_form_button_xpath).click()
+        if self._deep_links_enabled and self._filter_request is None:
+            self._filter_request = self._learn_filter_request(filter_form, acc_value, (from_date, to_date))
+        if self.capture:
+            # previous filter submit could reload the page with recorder
+            install_recorder(self.driver)
+        old_table = self._transactions_table_state()
+        retry = Retry(
+            function=partial(self._wait_transactions_table, old_table),
+            error=SeleniumTimeoutException,
+            err_msg=f'Error. WebDriver not found filtered transactions for timeout {TIMEOUT}',
+            max_attempts=2
+        )
+        with throttled(self.rate_limiter):
+            filter_form.find_element(By.XPATH, transaction_form_button_xpath).click()
+        # rows of old table must not be saved as transactions of this account, so timeout fails the cycle
+        try:
+            retry()
+        except SeleniumTimeoutException:
+            if self.rate_limiter is not None:
+                self.rate_limiter.report(TIMEOUT, error=True)
+            raise
+
+    def logout(self) -> None:
+        """Log out by exit link of sberbank-online, then delete cookies, which are left."""
+        links = self.driver.find_elements(By.XPATH, LOGOUT_LINK_XPATH)
+        if not links and self.main_menu_link is not None:
+            self.driver.get(self.main_menu_link)
+            links = self.driver.find_elements(By.XPATH, LOGOUT_LINK_XPATH)
+        if links:
+            self.driver.get(links[0].get_attribute('href'))
+        else:
+            logger.warning('Logout link is not found. Only cookies are deleted')
+        super(SberbankClientParser, self).logout()
 
     def close(self) -> None:
         """Adding logout for graceful shutdown."""
         super(SberbankClientParser, self).close()
+        for page_driver in self._page_drivers:
+            with suppress(WebDriverException):
+                page_driver.quit()
+        self._page_drivers.clear()
         self.main_menu_link = None  # logout for check_authorization
+        self._filter_request = None
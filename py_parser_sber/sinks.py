@@ -0,0 +1,337 @@
+"""
+Concrete implementations of AbstractSink from the module abstract.py.
+
+HttpSink posts data to BudgetTracker-like web server (see contracts.yml).
+SQLiteSink, CsvSink and ParquetSink write local copy of data, which is fast to query.
+Transactions are written to them once by id: parser reads overlapping date ranges, so it sends same transactions
+again. Transactions, saved with legacy ids, are re-keyed to new ids (see TRANSACTION_ID_SCHEMES).
+"""
+
+import csv
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+)
+
+import requests
+from requests.exceptions import ConnectionError
+
+from py_parser_sber.abstract import AbstractSink
+from py_parser_sber.utils import Retry
+
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_FIELDS = ['name', 'value', 'ccy', 'seen_at']
+TRANSACTION_FIELDS = ['id', 'account', 'when', 'amount', 'currency', 'what']
+
+
+class RejectedItemsError(Exception):
+    """Receiver did not save part of items, which can be sent again."""
+
+
+def _seen_at() -> str:
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+def _month(when: str) -> str:
+    """Get month partition name from transaction time in format %Y.%m.%d."""
+    return when[:7].replace('.', '-')
+
+
+def _replaced_ids(transactions: List[Dict]) -> Set[str]:
+    """Get ids of transactions, which are replaced by these ones: their ids and legacy ids."""
+    return {tr['id'] for tr in transactions} | {tr['legacy_id'] for tr in transactions if tr.get('legacy_id')}
+
+
+class HttpSink(AbstractSink):  # noqa H601
+    """Send data to BudgetTracker-like web server by post requests."""
+
+    def __init__(self, send_account_url: str, send_payment_url: str, batch_size: Optional[int] = None):
+        super(HttpSink, self).__init__(batch_size=batch_size)
+        self.send_account_url = send_account_url
+        self.send_payment_url = send_payment_url
+
+    @staticmethod
+    def _rejected_items(response: requests.Response) -> List[Dict]:
+        """Get rejected items from batch acknowledgement of receiver. Other receivers answer without it."""
+        try:
+            result = response.json()
+        except ValueError:
+            return []
+        rejected = result.get('rejected') if isinstance(result, dict) else None
+        return [item for item in rejected if isinstance(item, dict)] if isinstance(rejected, list) else []
+
+    @classmethod
+    def _send_request(cls, url: str, data: List[Dict]) -> None:
+        """Send data. If receiver rejects part of items as temporary failed, only they are sent again."""
+        headers = {'content-type': 'application/json'}
+        connection_retry = Retry(
+            function=requests.post,
+            error=ConnectionError,
+            err_msg=f'request to url {url} not sending',
+            max_attempts=3
+        )
+        pending = list(data)
+
+        def send_pending():
+            r = connection_retry(url=url, data=json.dumps(pending), headers=headers)
+            if r.status_code != 200:
+                logger.warning(f'request to url {url} with data {pending} not sending')
+                logger.error(r.text)
+                # balances are not saved after error, so data is sent again by next iteration
+                raise requests.HTTPError(f'{url} answered with status {r.status_code}', response=r)
+
+            rejected = cls._rejected_items(r)
+            invalid = [item for item in rejected if not item.get('retry')]
+            if invalid:
+                logger.warning(f'{len(invalid)} items are rejected by {url} as invalid: {invalid}')
+            pending[:] = [pending[item['index']] for item in rejected
+                          if item.get('retry') and isinstance(item.get('index'), int) and item['index'] < len(pending)]
+            if pending:
+                raise RejectedItemsError(f'{len(pending)} items are not saved by {url}')
+
+        retry = Retry(
+            function=send_pending,
+            error=RejectedItemsError,
+            err_msg=f'part of items is rejected by {url} and will be sent again',
+            max_attempts=3
+        )
+        retry()
+
+    def _write_accounts_batch(self, accounts: List[Dict]) -> None:
+        self._send_request(url=self.send_account_url, data=accounts)
+
+    def _write_transactions_batch(self, transactions: List[Dict]) -> None:
+        self._send_request(url=self.send_payment_url, data=transactions)
+
+    def __repr__(self):  # noqa D105
+        return f'{self.__class__.__name__}({self.send_account_url!r}, {self.send_payment_url!r})'
+
+
+class SQLiteSink(AbstractSink):  # noqa H601
+    """
+    Write data to SQLite database.
+
+    Accounts are appended as balance history, transactions are upserted by id.
+    """
+
+    def __init__(self, path: str, batch_size: Optional[int] = 500):
+        super(SQLiteSink, self).__init__(batch_size=batch_size)
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS accounts (name TEXT, value REAL, ccy TEXT, seen_at TEXT)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS transactions ('
+                'id TEXT PRIMARY KEY, account TEXT, "when" TEXT, amount REAL, currency TEXT, what TEXT)')
+
+    def _write_accounts_batch(self, accounts: List[Dict]) -> None:
+        seen_at = _seen_at()
+        with self._connection:
+            self._connection.executemany(
+                'INSERT INTO accounts (name, value, ccy, seen_at) VALUES (?, ?, ?, ?)',
+                [(acc['name'], float(acc['value']), acc['ccy'], seen_at) for acc in accounts])
+
+    def _write_transactions_batch(self, transactions: List[Dict]) -> None:
+        with self._connection:
+            # migration of transaction ids: transactions, saved with legacy ids, are written again with new ones
+            self._connection.executemany(
+                'DELETE FROM transactions WHERE id = ?',
+                [(tr['legacy_id'],) for tr in transactions if tr.get('legacy_id')])
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO transactions (id, account, "when", amount, currency, what) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(tr['id'], tr['account'], tr['when'], float(tr['amount']), tr['currency'], tr['what'])
+                 for tr in transactions])
+
+    def close(self) -> None:
+        """Flush buffers and close connection."""
+        super(SQLiteSink, self).close()
+        self._connection.close()
+
+    def __repr__(self):  # noqa D105
+        return f'{self.__class__.__name__}({self.path!r})'
+
+
+class CsvSink(AbstractSink):  # noqa H601
+    """
+    Append data to accounts.csv and transactions.csv in directory.
+
+    Transaction is appended once by id. Rows with legacy ids are removed, when transactions with new ids come.
+    """
+
+    def __init__(self, path: str, batch_size: Optional[int] = 500):
+        super(CsvSink, self).__init__(batch_size=batch_size)
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._transaction_ids = {row['id'] for row in self._read('transactions.csv')}
+
+    def _read(self, filename: str) -> Iterator[Dict[str, str]]:
+        file_path = self.path / filename
+        if not file_path.exists():
+            return
+        with file_path.open(newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
+    def _append(self, filename: str, fieldnames: List[str], rows: List[Dict]) -> None:
+        file_path = self.path / filename
+        write_header = not file_path.exists() or not file_path.stat().st_size
+        with file_path.open('a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+            if write_header:
+                writer.writeheader()
+            writer.writerows(rows)
+
+    def _remove_transactions(self, ids: Set[str]) -> None:
+        """Rewrite transactions.csv without transactions with these ids."""
+        file_path = self.path / 'transactions.csv'
+        tmp_path = file_path.with_name(f'{file_path.name}.tmp')
+        with tmp_path.open('w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=TRANSACTION_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(row for row in self._read('transactions.csv') if row['id'] not in ids)
+        os.replace(str(tmp_path), str(file_path))
+        self._transaction_ids -= ids
+
+    def _write_accounts_batch(self, accounts: List[Dict]) -> None:
+        seen_at = _seen_at()
+        self._append('accounts.csv', ACCOUNT_FIELDS, [dict(acc, seen_at=seen_at) for acc in accounts])
+
+    def _write_transactions_batch(self, transactions: List[Dict]) -> None:
+        # migration of transaction ids: remove transactions, saved with legacy ids
+        legacy_ids = {tr['legacy_id'] for tr in transactions if tr.get('legacy_id') in self._transaction_ids}
+        if legacy_ids:
+            self._remove_transactions(legacy_ids)
+
+        new_transactions: Dict[str, Dict] = {}
+        for tr in transactions:
+            if tr['id'] not in self._transaction_ids:
+                new_transactions.setdefault(tr['id'], tr)
+        if new_transactions:
+            self._append('transactions.csv', TRANSACTION_FIELDS, list(new_transactions.values()))
+            self._transaction_ids.update(new_transactions)
+
+    def __repr__(self):  # noqa D105
+        return f'{self.__class__.__name__}({str(self.path)!r})'
+
+
+class ParquetSink(AbstractSink):  # noqa H601
+    """
+    Write data to parquet files, partitioned by month: <path>/<table>/month=YYYY-MM/part-<uuid>.parquet.
+
+    Month partition is rewritten to one file on every write, so small batches do not pile up as small files.
+    Transactions are upserted by id, accounts are appended as balance history.
+    Needs pyarrow: pip install py_parser_sber[parquet]
+    """
+
+    def __init__(self, path: str, batch_size: Optional[int] = 5000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as err:
+            raise ImportError('ParquetSink needs pyarrow: pip install py_parser_sber[parquet]') from err
+
+        super(ParquetSink, self).__init__(batch_size=batch_size)
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = Path(path)
+
+    def _read_rows(self, file_path: Path) -> List[Dict]:
+        columns = self._pq.read_table(str(file_path)).to_pydict()
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    def _write_partitioned(self, table: str, fieldnames: List[str], rows: List[Dict], month_field: str,
+                           key: Optional[str] = None) -> None:
+        """Rewrite month partitions with new rows. If key is set, old rows with ids of new ones are replaced."""
+        partitions: Dict[str, List[Dict]] = defaultdict(list)
+        for row in rows:
+            partitions[_month(row[month_field])].append(row)
+
+        for month, month_rows in partitions.items():
+            self._rewrite_partition(self.path / table / f'month={month}', fieldnames, month_rows, key)
+
+    def _rewrite_partition(self, partition_path: Path, fieldnames: List[str], rows: List[Dict],
+                           key: Optional[str] = None) -> None:
+        partition_path.mkdir(parents=True, exist_ok=True)
+        old_files = sorted(partition_path.glob('*.parquet'))
+        old_rows = [row for file_path in old_files for row in self._read_rows(file_path)]
+        if key is not None:
+            replaced_ids = _replaced_ids(rows)
+            old_rows = [row for row in old_rows if row[key] not in replaced_ids]
+            rows = list({row[key]: row for row in rows}.values())
+
+        all_rows = old_rows + rows
+        columns = {field: [row[field] for row in all_rows] for field in fieldnames}
+        file_path = partition_path / f'part-{uuid.uuid4().hex}.parquet'
+        tmp_path = file_path.with_name(f'{file_path.name}.tmp')
+        self._pq.write_table(self._pa.Table.from_pydict(columns), str(tmp_path))
+        os.replace(str(tmp_path), str(file_path))
+        for old_file in old_files:
+            old_file.unlink()
+
+    def _write_accounts_batch(self, accounts: List[Dict]) -> None:
+        seen_at = _seen_at()
+        rows = [dict(acc, value=float(acc['value']), seen_at=seen_at) for acc in accounts]
+        self._write_partitioned('accounts', ACCOUNT_FIELDS, rows, month_field='seen_at')
+
+    def _write_transactions_batch(self, transactions: List[Dict]) -> None:
+        rows = [dict(tr, amount=float(tr['amount'])) for tr in transactions]
+        self._write_partitioned('transactions', TRANSACTION_FIELDS, rows, month_field='when', key='id')
+
+    def __repr__(self):  # noqa D105
+        return f'{self.__class__.__name__}({str(self.path)!r})'
+
+
+class MemorySink(AbstractSink):  # noqa H601
+    """Keep data in memory, for example, to compare results of replayed runs."""
+
+    def __init__(self, batch_size: Optional[int] = None):
+        super(MemorySink, self).__init__(batch_size=batch_size)
+        self.accounts: List[Dict] = []
+        self.transactions: List[Dict] = []
+
+    def _write_accounts_batch(self, accounts: List[Dict]) -> None:
+        self.accounts.extend(accounts)
+
+    def _write_transactions_batch(self, transactions: List[Dict]) -> None:
+        self.transactions.extend(transactions)
+
+
+def sinks_from_spec(spec: str, batch_size: Optional[int] = None,
+                    send_account_url: Optional[str] = None, send_payment_url: Optional[str] = None
+                    ) -> List[AbstractSink]:
+    """
+    Create sinks from comma-separated spec, like "http,sqlite:data.db,parquet:data/,csv:data/".
+
+    "http" sink is created only if send_account_url and send_payment_url are set.
+    """
+    local_sinks = {
+        'sqlite': SQLiteSink,
+        'csv': CsvSink,
+        'parquet': ParquetSink,
+    }
+    sinks: List[AbstractSink] = []
+    for item in filter(None, (raw_item.strip() for raw_item in spec.split(','))):
+        kind, _, path = item.partition(':')
+        if kind == 'http':
+            if send_account_url and send_payment_url:
+                sinks.append(HttpSink(send_account_url, send_payment_url))
+            continue
+        if kind not in local_sinks or not path:
+            raise ValueError(f'Bad sink {item!r}. Use http, sqlite:<path>, csv:<path> or parquet:<path>')
+        kwargs = {'batch_size': batch_size} if batch_size else {}
+        sinks.append(local_sinks[kind](path, **kwargs))
+    return sinks
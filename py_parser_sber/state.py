@@ -0,0 +1,56 @@
+"""State of parser, persisted between runs in json file."""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Optional,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """
+    Json file with named sections of parser state.
+
+    If path is not set, state lives only in memory of current process.
+    State can be shared between parsers in threads: change sections under lock, with state.lock.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._state: Dict[str, Dict[str, Any]] = self._load()
+        self.lock = threading.RLock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            with self.path.open() as f:
+                return json.load(f)
+        except (OSError, ValueError) as err:
+            logger.warning(f'State file {self.path} is broken and will be rewritten: {err}')
+            return {}
+
+    def section(self, name: str) -> Dict[str, Any]:
+        """Get mutable section of state by name."""
+        with self.lock:
+            return self._state.setdefault(name, {})
+
+    def save(self) -> None:
+        """Save state atomically: write to temporary file and replace old one."""
+        if self.path is None:
+            return
+        tmp_path = self.path.with_name(f'{self.path.name}.tmp')
+        # sections are not changed by other threads during dump
+        with self.lock:
+            with tmp_path.open('w') as f:
+                json.dump(self._state, f, ensure_ascii=False, indent=2)
+            os.replace(str(tmp_path), str(self.path))
+        logger.debug(f'State saved to {self.path}')
@@ -0,0 +1,170 @@
+"""
+Shared rate limiter of requests to bank site: page loads, navigating clicks and form submits.
+
+Limiter is token bucket with adaptive rate (AIMD): rate is halved, when requests are slow or failed,
+and grows step by step, while they are fast. Concurrent requests are limited by slots.
+If path is set, bucket and slots are shared by every thread and process on host, which use the same path
+(file locks, POSIX only). Otherwise, they are shared by threads of current process.
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    Optional,
+)
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+SLOT_POLL_INTERVAL = 0.05
+
+
+class RateLimiter:
+    """
+    Token bucket with adaptive rate and limit of concurrent requests.
+
+    Every request to bank site is done in context of request(): it waits for free slot and token,
+    and reports latency and error of request for adaptation of rate.
+    """
+
+    def __init__(self, rate: float, max_rate: Optional[float] = None, min_rate: Optional[float] = None,
+                 burst: float = 1, max_concurrent: int = 1, target_latency: float = 10,
+                 increase: Optional[float] = None, path: Optional[str] = None):
+        if rate <= 0:
+            raise ValueError('Rate of requests must be positive')
+        self.initial_rate = rate
+        self.max_rate = max(max_rate or rate, rate)
+        self.min_rate = min(min_rate or rate / 10, rate)
+        self.burst = max(burst, 1)
+        self.max_concurrent = max(max_concurrent, 1)
+        self.target_latency = target_latency
+        # additive increase: from min_rate to max_rate by 20 fast requests
+        self.increase = increase or (self.max_rate - self.min_rate) / 20
+
+        self.path = Path(path) if path and fcntl is not None else None
+        if path and self.path is None:
+            logger.warning('File locks are not available. Rate limiter is shared only by threads of this process')
+        self._lock = threading.Lock()
+        self._memory_state: Dict[str, Any] = {}
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+
+    def _initial_state(self) -> Dict[str, Any]:
+        return {'rate': self.initial_rate, 'tokens': self.burst, 'updated_at': time.time(), 'decreased_at': 0}
+
+    @contextmanager
+    def _state(self) -> Iterator[Dict[str, Any]]:
+        """Lock shared state of bucket and save its changes."""
+        with self._lock:
+            if self.path is None:
+                if not self._memory_state:
+                    self._memory_state.update(self._initial_state())
+                yield self._memory_state
+                return
+
+            with self.path.with_name(f'{self.path.name}.lock').open('a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    try:
+                        state = json.loads(self.path.read_text())
+                    except (OSError, ValueError):
+                        state = self._initial_state()
+                    yield state
+                    self.path.write_text(json.dumps(state))
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @property
+    def rate(self) -> float:
+        """Get current rate of requests per second."""
+        with self._state() as state:
+            return state['rate']
+
+    def _take_token(self) -> None:
+        while True:
+            with self._state() as state:
+                now = time.time()
+                # clock of other process can be a bit behind
+                elapsed = max(now - state['updated_at'], 0)
+                state['tokens'] = min(self.burst, state['tokens'] + elapsed * state['rate'])
+                state['updated_at'] = now
+                if state['tokens'] >= 1:
+                    state['tokens'] -= 1
+                    return
+                wait = (1 - state['tokens']) / state['rate']
+            time.sleep(wait)
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        if self.path is None:
+            with self._slots:
+                yield
+            return
+
+        # slot is exclusive lock of one of slot files. It is released by system, if process dies
+        while True:
+            for number in range(self.max_concurrent):
+                slot_file = self.path.with_name(f'{self.path.name}.slot{number}').open('a')
+                try:
+                    fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    slot_file.close()
+                    continue
+                try:
+                    yield
+                finally:
+                    fcntl.flock(slot_file, fcntl.LOCK_UN)
+                    slot_file.close()
+                return
+            time.sleep(SLOT_POLL_INTERVAL)
+
+    def report(self, latency: float, error: bool = False) -> None:
+        """Adapt rate by result of request: decrease multiplicatively, if it is slow or failed, else increase."""
+        with self._state() as state:
+            now = time.time()
+            if error or latency > self.target_latency:
+                # one decrease for all requests, which were in flight, when site slowed down
+                if now - state['decreased_at'] < self.target_latency:
+                    return
+                state['rate'] = max(self.min_rate, state['rate'] / 2)
+                state['decreased_at'] = now
+                logger.info(f'Requests to bank site are slow or failed. Rate is decreased to {state["rate"]:.2f}/s')
+            else:
+                state['rate'] = min(self.max_rate, state['rate'] + self.increase)
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """Wait for free slot and token, then measure request in context."""
+        with self._slot():
+            self._take_token()
+            start_time = time.monotonic()
+            try:
+                yield
+            except Exception:
+                self.report(time.monotonic() - start_time, error=True)
+                raise
+            self.report(time.monotonic() - start_time)
+
+    def __repr__(self):  # noqa D105
+        return f'{self.__class__.__name__}(rate={self.initial_rate}, max_concurrent={self.max_concurrent})'
+
+
+@contextmanager
+def throttled(rate_limiter: Optional[RateLimiter]) -> Iterator[None]:
+    """Do request in context of rate limiter, if it is set."""
+    if rate_limiter is None:
+        yield
+        return
+    with rate_limiter.request():
+        yield
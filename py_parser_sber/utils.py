@@ -2,6 +2,7 @@
 
 import datetime
 import logging
+import math
 import os
 import string
 import time
@@ -11,6 +12,7 @@ from typing import (
     Dict,
     List,
     Optional,
+    Sequence,
     Type,
 )
 from urllib.error import URLError
@@ -60,6 +62,20 @@ def sber_time_format(datetime_obj: datetime.datetime):
     return format(datetime_obj, '%d%m%Y')
 
 
+def detect_date_format(value: str, date: datetime.datetime,
+                       formats: Sequence[str] = ('%d.%m.%Y', '%d%m%Y', '%d/%m/%Y', '%Y-%m-%d')) -> Optional[str]:
+    """Find format, which formats date to value."""
+    return next((date_format for date_format in formats if format(date, date_format) == value), None)
+
+
+def split_evenly(items: Sequence[Any], parts: int) -> List[Sequence[Any]]:
+    """Split items to not more than parts contiguous chunks of near equal size."""
+    if not items:
+        return []
+    size = math.ceil(len(items) / max(parts, 1))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
 def uri_validator(x: str) -> str:
     """Validate uri by contain scheme and netloc."""
     try:
@@ -66,11 +66,21 @@ tests_require = [
     'pytest',
 ]
 
+parquet_require = [
+    'pyarrow',
+]
+
+replay_require = [
+    'lxml',
+]
+
 extras_require = {
     'static_analysis': static_analysis_require,
     'vulnerability_check': vulnerability_check_require,
     'docs': docs_require,
     'tests': tests_require,
+    'parquet': parquet_require,
+    'replay': replay_require,
 }
 
 extras_require['all'] = []
@@ -95,6 +105,12 @@ setup(
         'console_scripts': [
             'py_parser_sber_run_once = py_parser_sber.main:py_parser_sber_run_once',
             'py_parser_sber_run_infinite = py_parser_sber.main:py_parser_sber_run_infinite',
+            'py_parser_sber_run_daemon = py_parser_sber.main:py_parser_sber_run_daemon',
+            'py_parser_sber_record = py_parser_sber.main:py_parser_sber_record',
+            'py_parser_sber_replay = py_parser_sber.main:py_parser_sber_replay',
+        ],
+        'py_parser_sber.banks': [
+            'sberbank = py_parser_sber.sberbank_parse:SberbankClientParser',
         ],
     },
     python_requires='>=3.6',
@@ -17,6 +17,7 @@ class PaymentSchema(Schema):
     amount = fields.Float()
     currency = fields.Str()
     what = fields.Str()
+    legacy_id = fields.Str()
 
 
 app = Flask(__name__)
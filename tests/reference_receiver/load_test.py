@@ -0,0 +1,72 @@
+"""
+Load test of receiver: post generated payments by batches from several threads.
+
+Reports ingest rows/sec and latency percentiles of requests.
+
+    python load_test.py --url http://localhost:8080/send_payment --rows 100000 --batch-size 1000 --concurrency 4
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def generate_batch(size, start):
+    return [{
+        'id': uuid.uuid4().hex,
+        'account': f'Card {(start + i) % 5}',
+        'when': f'2020.{(start + i) % 12 + 1:02d}.{(start + i) % 28 + 1:02d}',
+        'amount': f'{(start + i) % 10000}.{i % 100:02d}',
+        'currency': 'RUB',
+        'what': f'Payment {start + i}',
+    } for i in range(size)]
+
+
+def percentile(values, part):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * part))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8080/send_payment')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    bodies = [json.dumps(generate_batch(min(args.batch_size, args.rows - start), start))
+              for start in range(0, args.rows, args.batch_size)]
+    # session (keep-alive connection) per thread
+    local = threading.local()
+
+    def send(body):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start_time = time.monotonic()
+        response = local.session.post(args.url, data=body, headers={'content-type': 'application/json'})
+        latency = time.monotonic() - start_time
+        result = response.json() if response.status_code == 200 else {'accepted': [], 'rejected': []}
+        return latency, len(result['accepted']), len(result['rejected'])
+
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(send, bodies))
+    duration = time.monotonic() - start_time
+
+    latencies = [latency for latency, _, _ in results]
+    accepted = sum(count for _, count, _ in results)
+    rejected = sum(count for _, _, count in results)
+    print(f'rows: {args.rows}, batch size: {args.batch_size}, concurrency: {args.concurrency}')
+    print(f'accepted: {accepted}, rejected: {rejected}, duration: {duration:.2f} s')
+    print(f'ingest: {accepted / duration:.0f} rows/sec')
+    print(f'latency: p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p99 {percentile(latencies, 0.99) * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Reference receiver of py_parser_sber data (see contracts.yml) for bulk ingest.
+
+Bodies are parsed by stream, item by item, valid items are upserted to SQLite by batches
+(payments by id, accounts by name). Response contains accepted ids and rejected items with errors:
+items with retry=true (storage error) can be sent again, others are invalid.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+
+import ijson
+from flask import Flask, Response, request
+from marshmallow import EXCLUDE, Schema, fields
+
+
+DB_PATH = os.getenv('RECEIVER_DB_PATH', 'receiver.db')
+BATCH_SIZE = int(os.getenv('RECEIVER_BATCH_SIZE', 1000))
+
+
+class AccountSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    name = fields.Str(required=True)
+    value = fields.Float(required=True)
+    ccy = fields.Str(required=True)
+
+
+class PaymentSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    id = fields.Str(required=True)
+    account = fields.Str(required=True)
+    when = fields.DateTime(format='%Y.%m.%d', required=True)
+    amount = fields.Float(required=True)
+    currency = fields.Str(required=True)
+    what = fields.Str(required=True)
+    legacy_id = fields.Str()
+
+
+class BodyReader:
+    """Request body for ijson, which probes it by read(0): some versions of Werkzeug treat it as disconnect."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read(self, size=-1):
+        return self.stream.read(size) if size else b''
+
+
+def connect():
+    connection = sqlite3.connect(DB_PATH, timeout=5)
+    connection.execute('PRAGMA journal_mode=WAL')
+    return connection
+
+
+def write(upsert, items):
+    connection = connect()
+    try:
+        with connection:
+            upsert(connection, items)
+    finally:
+        connection.close()
+
+
+def create_tables(connection, items):
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, value REAL, ccy TEXT, received_at TEXT)')
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS payments ('
+        'id TEXT PRIMARY KEY, account TEXT, "when" TEXT, amount REAL, currency TEXT, what TEXT, received_at TEXT)')
+
+
+def upsert_accounts(connection, items):
+    received_at = datetime.datetime.now().isoformat(timespec='seconds')
+    connection.executemany(
+        'INSERT INTO accounts (name, value, ccy, received_at) VALUES (?, ?, ?, ?) '
+        'ON CONFLICT(name) DO UPDATE SET value = excluded.value, ccy = excluded.ccy, '
+        'received_at = excluded.received_at',
+        [(item['name'], float(item['value']), item['ccy'], received_at) for item in items])
+
+
+def upsert_payments(connection, items):
+    received_at = datetime.datetime.now().isoformat(timespec='seconds')
+    # migration of transaction ids of py_parser_sber: payments, saved with legacy ids, are written again with new ones
+    connection.executemany(
+        'DELETE FROM payments WHERE id = ?',
+        [(item['legacy_id'],) for item in items if item.get('legacy_id')])
+    connection.executemany(
+        'INSERT INTO payments (id, account, "when", amount, currency, what, received_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT(id) DO UPDATE SET account = excluded.account, "when" = excluded."when", '
+        'amount = excluded.amount, currency = excluded.currency, what = excluded.what, '
+        'received_at = excluded.received_at',
+        [(item['id'], item['account'], item['when'], float(item['amount']), item['currency'], item['what'],
+          received_at) for item in items])
+
+
+def ingest(schema, key, upsert):
+    """Validate and upsert items of json array from request body by batches."""
+    accepted, rejected = [], []
+    batch = []
+
+    def write_batch():
+        try:
+            write(upsert, [item for _, item in batch])
+        except sqlite3.Error as err:
+            rejected.extend({'index': index, key: item.get(key), 'errors': {'_storage': [str(err)]}, 'retry': True}
+                            for index, item in batch)
+        else:
+            accepted.extend(item[key] for _, item in batch)
+        batch.clear()
+
+    try:
+        for index, item in enumerate(ijson.items(BodyReader(request.stream), 'item')):
+            errors = schema.validate(item) if isinstance(item, dict) else {'_schema': ['Invalid item']}
+            if errors:
+                rejected.append({'index': index, key: item.get(key) if isinstance(item, dict) else None,
+                                 'errors': errors, 'retry': False})
+                continue
+            batch.append((index, item))
+            if len(batch) >= BATCH_SIZE:
+                write_batch()
+    except ijson.JSONError as err:
+        if batch:
+            write_batch()
+        body = {'error': f'Invalid json: {err}', 'accepted': accepted, 'rejected': rejected}
+        return Response(response=json.dumps(body, default=str), status=400, mimetype='application/json')
+
+    if batch:
+        write_batch()
+    body = {'accepted': accepted, 'rejected': rejected}
+    return Response(response=json.dumps(body, default=str), status=200, mimetype='application/json')
+
+
+app = Flask(__name__)
+
+
+@app.route('/healthcheck')
+def status():
+    return Response(status=200)
+
+
+@app.route('/send_account', methods=['POST'])
+def send_account():
+    return ingest(AccountSchema(), 'name', upsert_accounts)
+
+
+@app.route('/send_payment', methods=['POST'])
+def send_payment():
+    return ingest(PaymentSchema(), 'id', upsert_payments)
+
+
+write(create_tables, [])
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.getenv('RECEIVER_PORT', 8080)), threaded=True)
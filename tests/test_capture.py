@@ -0,0 +1,93 @@
+"""Tests of parsers of network capture mode on saved pages of bank site."""
+
+from pathlib import Path
+
+import pytest
+
+from py_parser_sber.capture import (
+    capture_transactions,
+    parse_accounts_html,
+    parse_transactions_html,
+    parse_transactions_json,
+)
+
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'capture'
+
+TRANSACTIONS = [
+    ['Пятёрочка\nСупермаркеты', 'Visa Classic', '', 'Сегодня', '-1 234,50 руб.'],
+    ['Перевод с карты\nПереводы', 'Visa Classic', '', '03.02', '+5 000,00 руб.'],
+]
+
+
+def read_fixture(name):
+    return (FIXTURES / name).read_text(encoding='utf-8')
+
+
+class FakeDriver:
+    """Driver with page source and responses, recorded by injected script."""
+
+    def __init__(self, page_source, responses=()):
+        self.page_source = page_source
+        self.responses = list(responses)
+
+    def execute_script(self, script, *args):
+        responses, self.responses = self.responses, []
+        return responses
+
+
+def test_parse_accounts_html():
+    assert parse_accounts_html(read_fixture('accounts.html')) == [
+        {'name': 'Visa Classic', 'url': '/PhizIC/private/cards/info.do?id=100001', 'raw_funds': '12 345,67 руб.'},
+        {'name': 'MasterCard Gold', 'url': '/PhizIC/private/cards/info.do?id=100002', 'raw_funds': '1 000,00 $'},
+    ]
+
+
+@pytest.mark.parametrize('html', [
+    '<html><body><p>Нет продуктов</p></body></html>',
+    # account block without link to account page
+    '<div class="productCover"><span class="titleBlock" title="Visa"></span>'
+    '<span class="overallAmount">1,00 руб.</span></div>',
+])
+def test_parse_accounts_html_not_recognized(html):
+    assert parse_accounts_html(html) is None
+
+
+def test_parse_transactions_html():
+    assert parse_transactions_html(read_fixture('transactions.html')) == TRANSACTIONS
+
+
+@pytest.mark.parametrize('html', [
+    '<html><body><p>Операций не найдено</p></body></html>',
+    '<table id="simpleTable0"><tr class="ListLine0"><td>Пятёрочка</td><td>Сегодня</td></tr></table>',
+])
+def test_parse_transactions_html_not_recognized(html):
+    assert parse_transactions_html(html) is None
+
+
+def test_parse_transactions_json():
+    assert parse_transactions_json(read_fixture('transactions.json')) == TRANSACTIONS
+
+
+@pytest.mark.parametrize('body', [
+    'not json',
+    '["html"]',
+    '{"status": "ok"}',
+    '{"html": "<p>Операций не найдено</p>"}',
+])
+def test_parse_transactions_json_not_recognized(body):
+    assert parse_transactions_json(body) is None
+
+
+def test_capture_transactions_from_last_recognized_response():
+    responses = [
+        {'url': '/operations.do', 'contentType': 'application/json', 'body': read_fixture('transactions.json')},
+        {'url': '/counters.do', 'contentType': 'application/json', 'body': '{"unread": 1}'},
+    ]
+    driver = FakeDriver('<html><body></body></html>', responses)
+    assert capture_transactions(driver) == TRANSACTIONS
+
+
+def test_capture_transactions_from_page_source():
+    driver = FakeDriver(read_fixture('transactions.html'))
+    assert capture_transactions(driver) == TRANSACTIONS
@@ -0,0 +1,57 @@
+"""Tests of offline replay of recorded bundle and of scrubbing of recorded pages."""
+
+import json
+from pathlib import Path
+
+from py_parser_sber.replay import (
+    replay_bundle,
+    scrub,
+)
+
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'replay'
+
+
+def test_replay_bundle():
+    expected = json.loads((FIXTURES / 'expected.json').read_text(encoding='utf-8'))
+    for _ in range(2):
+        stats, sink = replay_bundle(str(FIXTURES / 'bundle'))
+        assert {'accounts': sink.accounts, 'transactions': sink.transactions} == expected
+        assert stats['transactions'] == len(expected['transactions'])
+
+
+def test_replay_bundle_relative_dates_on_recorded_time():
+    _, sink = replay_bundle(str(FIXTURES / 'bundle'))
+    # Сегодня, Сегодня, Вчера and 03.02 of bundle, recorded at 2020-02-05
+    assert [transaction['when'] for transaction in sink.transactions] == [
+        '2020.02.05', '2020.02.05', '2020.02.04', '2020.02.03']
+
+
+def test_scrub_personal_data():
+    text = scrub('Счёт 40817810099910004312, карта 4276 1234 5678 9012, Иванов Иван Иванович, '
+                 'Петров П. П., Иван Иванович И., +7 (900) 123-45-67, ivanov@mail.ru, info.do?id=552211')
+    assert text == ('Счёт ****************4312, карта **** **** **** 9012, ***, '
+                    '***, ***, +7 *** ***-**-**, ***@***, info.do?id=id1')
+
+
+def test_scrub_client_name_block():
+    html = '<div class="header"><span class="userName">Иванова А.</span><a href="/logoff.do">Выход</a></div>'
+    assert scrub(html) == '<div class="header"><span class="userName">***</span><a href="/logoff.do">Выход</a></div>'
+
+
+def test_scrub_ids_by_same_pseudonyms():
+    ids = {}
+    first = scrub('<a href="/PhizIC/private/cards/info.do?id=552211">Visa</a><a href="/info.do?id=552299">MC</a>',
+                  ids=ids)
+    second = scrub('<li value="card:552211">Visa</li><li value="card:552299">MC</li><p>5522110,00 руб.</p>', ids=ids)
+    assert first == '<a href="/PhizIC/private/cards/info.do?id=id1">Visa</a><a href="/info.do?id=id2">MC</a>'
+    assert second == '<li value="card:id1">Visa</li><li value="card:id2">MC</li><p>5522110,00 руб.</p>'
+    # scrub of replay keeps pseudonyms
+    assert scrub(first) == first
+    assert scrub(second) == second
+
+
+def test_scrub_credentials():
+    html = '<input id="login" value="client-login"><input type="password" name="psw" value="p@ss">'
+    assert scrub(html, secrets=['client-login']) == (
+        '<input id="login" value="***"><input type="password" name="psw" value="***">')
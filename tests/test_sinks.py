@@ -0,0 +1,119 @@
+"""Tests of deduplication and migration of transaction ids by local sinks."""
+
+import csv
+import sqlite3
+
+import pytest
+
+from py_parser_sber.sinks import (
+    CsvSink,
+    ParquetSink,
+    SQLiteSink,
+)
+
+
+def transaction(transaction_id, when='2020.02.05', amount='-250.00', legacy_id=None):
+    data = {'id': transaction_id, 'account': 'Visa Classic', 'when': when, 'amount': amount, 'currency': 'RUB',
+            'what': 'Кофейня'}
+    if legacy_id is not None:
+        data['legacy_id'] = legacy_id
+    return data
+
+
+LEGACY_BATCH = [transaction('legacy-1'), transaction('legacy-2', when='2020.01.31')]
+MIGRATE_BATCH = [transaction('content-1', legacy_id='legacy-1'),
+                 transaction('content-2', when='2020.01.31', legacy_id='legacy-2')]
+
+
+def sqlite_sink(tmp_path):
+    return SQLiteSink(str(tmp_path / 'data.db'))
+
+
+def sqlite_ids(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / 'data.db'))
+    try:
+        return sorted(row[0] for row in connection.execute('SELECT id FROM transactions'))
+    finally:
+        connection.close()
+
+
+def csv_sink(tmp_path):
+    return CsvSink(str(tmp_path / 'csv'))
+
+
+def csv_ids(tmp_path):
+    with (tmp_path / 'csv' / 'transactions.csv').open(newline='', encoding='utf-8') as f:
+        return sorted(row['id'] for row in csv.DictReader(f))
+
+
+def parquet_sink(tmp_path):
+    pytest.importorskip('pyarrow')
+    return ParquetSink(str(tmp_path / 'parquet'))
+
+
+def parquet_ids(tmp_path):
+    import pyarrow.parquet
+    return sorted(transaction_id for file_path in (tmp_path / 'parquet' / 'transactions').glob('*/*.parquet')
+                  for transaction_id in pyarrow.parquet.read_table(str(file_path)).column('id').to_pylist())
+
+
+LOCAL_SINKS = [
+    pytest.param(sqlite_sink, sqlite_ids, id='sqlite'),
+    pytest.param(csv_sink, csv_ids, id='csv'),
+    pytest.param(parquet_sink, parquet_ids, id='parquet'),
+]
+
+
+def write(sink_factory, tmp_path, transactions):
+    """Write transactions by new sink, like by new parser process."""
+    sink = sink_factory(tmp_path)
+    sink.write_transactions(transactions)
+    sink.close()
+
+
+@pytest.mark.parametrize('sink_factory, read_ids', LOCAL_SINKS)
+def test_same_batch_is_written_once(sink_factory, read_ids, tmp_path):
+    write(sink_factory, tmp_path, LEGACY_BATCH)
+    write(sink_factory, tmp_path, LEGACY_BATCH)
+    assert read_ids(tmp_path) == ['legacy-1', 'legacy-2']
+
+
+@pytest.mark.parametrize('sink_factory, read_ids', LOCAL_SINKS)
+def test_same_transaction_in_batch_is_written_once(sink_factory, read_ids, tmp_path):
+    write(sink_factory, tmp_path, LEGACY_BATCH + LEGACY_BATCH)
+    assert read_ids(tmp_path) == ['legacy-1', 'legacy-2']
+
+
+@pytest.mark.parametrize('sink_factory, read_ids', LOCAL_SINKS)
+def test_legacy_ids_are_replaced(sink_factory, read_ids, tmp_path):
+    write(sink_factory, tmp_path, LEGACY_BATCH)
+    write(sink_factory, tmp_path, MIGRATE_BATCH)
+    assert read_ids(tmp_path) == ['content-1', 'content-2']
+    write(sink_factory, tmp_path, MIGRATE_BATCH)
+    assert read_ids(tmp_path) == ['content-1', 'content-2']
+
+
+@pytest.mark.parametrize('sink_factory, read_ids', LOCAL_SINKS)
+def test_legacy_ids_are_replaced_when_new_ids_are_saved(sink_factory, read_ids, tmp_path):
+    write(sink_factory, tmp_path, LEGACY_BATCH + [transaction('content-1')])
+    write(sink_factory, tmp_path, MIGRATE_BATCH)
+    assert read_ids(tmp_path) == ['content-1', 'content-2']
+
+
+def test_sqlite_transactions_are_upserted(tmp_path):
+    write(sqlite_sink, tmp_path, [transaction('content-1')])
+    write(sqlite_sink, tmp_path, [transaction('content-1', amount='-300.00')])
+    connection = sqlite3.connect(str(tmp_path / 'data.db'))
+    try:
+        assert connection.execute('SELECT id, amount FROM transactions').fetchall() == [('content-1', -300.0)]
+    finally:
+        connection.close()
+
+
+def test_parquet_partition_is_one_file(tmp_path):
+    write(parquet_sink, tmp_path, LEGACY_BATCH)
+    write(parquet_sink, tmp_path, MIGRATE_BATCH + [transaction('content-3', when='2020.02.06')])
+    partitions = tmp_path / 'parquet' / 'transactions'
+    assert sorted(path.name for path in partitions.iterdir()) == ['month=2020-01', 'month=2020-02']
+    assert [len(list(path.glob('*.parquet'))) for path in sorted(partitions.iterdir())] == [1, 1]
+    assert parquet_ids(tmp_path) == ['content-1', 'content-2', 'content-3']
@@ -0,0 +1,85 @@
+"""Tests of shared rate limiter of requests to bank site."""
+
+import threading
+import time
+
+import pytest
+
+from py_parser_sber import throttle
+from py_parser_sber.throttle import RateLimiter
+
+
+pytestmark = pytest.mark.skipif(throttle.fcntl is None, reason='file locks are POSIX only')
+
+
+def limiter(tmp_path, **kwargs):
+    """Limiter of its own "process": limiters with the same path share bucket and slots by files."""
+    return RateLimiter(path=str(tmp_path / 'limiter.json'), **kwargs)
+
+
+def test_concurrent_requests_are_limited(tmp_path):
+    active, max_active = [0], [0]
+    lock = threading.Lock()
+
+    def worker():
+        rate_limiter = limiter(tmp_path, rate=100, burst=10, max_concurrent=2)
+        for _ in range(3):
+            with rate_limiter.request():
+                with lock:
+                    active[0] += 1
+                    max_active[0] = max(max_active[0], active[0])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max_active[0] == 2
+
+
+def test_requests_wait_for_tokens(tmp_path):
+    rate_limiter = limiter(tmp_path, rate=20, burst=1)
+    start_time = time.monotonic()
+    for _ in range(5):
+        with rate_limiter.request():
+            pass
+    # first token is in bucket, others come every 1/20 second
+    assert time.monotonic() - start_time >= 4 / 20 * 0.9
+
+
+def test_rate_is_halved_once_per_target_latency(tmp_path):
+    rate_limiter = limiter(tmp_path, rate=10, target_latency=0.2)
+    rate_limiter.report(0.1, error=True)
+    assert rate_limiter.rate == 5
+    # other requests, which were in flight, do not decrease rate again
+    rate_limiter.report(0.1, error=True)
+    rate_limiter.report(0.3)
+    assert rate_limiter.rate == 5
+    time.sleep(0.25)
+    rate_limiter.report(0.3)
+    assert rate_limiter.rate == 2.5
+
+
+def test_failed_request_is_reported(tmp_path):
+    rate_limiter = limiter(tmp_path, rate=10)
+    with pytest.raises(RuntimeError):
+        with rate_limiter.request():
+            raise RuntimeError('page is not loaded')
+    # state is shared by limiters of other processes
+    assert limiter(tmp_path, rate=10).rate == 5
+
+
+def test_rate_recovers_to_max_rate(tmp_path):
+    rate_limiter = limiter(tmp_path, rate=10, max_rate=20)
+    rate_limiter.report(0.1, error=True)
+    assert rate_limiter.rate == 5
+    rates = []
+    for _ in range(40):
+        rate_limiter.report(0.1)
+        rates.append(rate_limiter.rate)
+    assert rates == sorted(rates)
+    assert rates[0] < 20
+    assert rates[-1] == 20
@@ -0,0 +1,82 @@
+"""Tests of ids of transactions in legacy, migrate and content id schemes."""
+
+import datetime
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+
+from py_parser_sber.sberbank_parse import (
+    SberbankCardAccount,
+    SberbankTransaction,
+)
+
+
+TODAY = datetime.date(2020, 2, 5)
+ACCOUNT = SberbankCardAccount.from_raw(name='Visa Classic', url='/PhizIC/private/cards/info.do?id=100001',
+                                       raw_funds='12 345,67 руб.')
+
+SHOP = ['Пятёрочка\nСупермаркеты', 'Visa Classic', '', 'Сегодня', '-1 234,50 руб.']
+CAFE = ['Кофейня\nРестораны и кафе', 'Visa Classic', '', 'Вчера', '-250,00 руб.']
+
+# ids of first version, which are saved by receivers: uuid5 of repr of transaction with order_id in the day,
+# which is counted from the end of the day
+SHOP_LEGACY_IDS = ['036a90c8b04d57c68544583afe500495', '730e2b5d029353baa4b40302f0fd8038']
+SHOP_CONTENT_IDS = ['a09f88a2a5d85498935ce7673c31998f', '10d242da1079551785a0d46445ae146b']
+
+
+class FakeElement:
+    def is_displayed(self):
+        return False
+
+
+class FakeDriver:
+    """Driver of history page without paginator and without empty text."""
+
+    def find_element(self, by, value):
+        if 'emptyText' in value:
+            raise NoSuchElementException(value)
+        return FakeElement()
+
+
+def parse(pages, id_scheme):
+    transactions = SberbankTransaction.transaction_parser(
+        FakeDriver(), ACCOUNT, pages_reader=lambda driver, table, capture: iter(pages), id_scheme=id_scheme,
+        today=TODAY)
+    return [transaction.to_json() for transaction in transactions]
+
+
+def test_legacy_ids_of_baseline():
+    transactions = parse([[SHOP, SHOP, CAFE]], 'legacy')
+    assert [transaction['id'] for transaction in transactions[:2]] == SHOP_LEGACY_IDS
+    assert all('legacy_id' not in transaction for transaction in transactions)
+
+
+def test_content_ids():
+    transactions = parse([[SHOP, SHOP, CAFE]], 'content')
+    assert [transaction['id'] for transaction in transactions[:2]] == SHOP_CONTENT_IDS
+    assert all('legacy_id' not in transaction for transaction in transactions)
+
+
+def test_migrate_ids():
+    transactions = parse([[SHOP, SHOP, CAFE]], 'migrate')
+    assert [transaction['id'] for transaction in transactions[:2]] == SHOP_CONTENT_IDS
+    assert [transaction['legacy_id'] for transaction in transactions[:2]] == SHOP_LEGACY_IDS
+
+
+@pytest.mark.parametrize('id_scheme', ['legacy', 'migrate', 'content'])
+def test_same_transactions_of_day_have_different_ids(id_scheme):
+    transactions = parse([[SHOP, SHOP, SHOP, CAFE, CAFE]], id_scheme)
+    assert [transaction['when'] for transaction in transactions] == ['2020.02.05'] * 3 + ['2020.02.04'] * 2
+    assert len({transaction['id'] for transaction in transactions}) == 5
+
+
+@pytest.mark.parametrize('id_scheme', ['legacy', 'migrate', 'content'])
+def test_day_split_across_pages(id_scheme):
+    assert parse([[SHOP], [SHOP, CAFE], [CAFE]], id_scheme) == parse([[SHOP, SHOP, CAFE, CAFE]], id_scheme)
+
+
+def test_ids_do_not_depend_on_other_days():
+    today = parse([[SHOP, SHOP]], 'content')
+    assert parse([[SHOP, SHOP, CAFE]], 'content')[:2] == today
+    # legacy ids of day are positions of transactions in the day, so they do not depend on other days too
+    assert parse([[SHOP, SHOP, CAFE]], 'legacy')[:2] == parse([[SHOP, SHOP]], 'legacy')